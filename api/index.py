@@ -24,68 +24,19 @@ if not os.environ.get('SECRET_KEY'):
 os.environ['SQLALCHEMY_TRACK_MODIFICATIONS'] = 'False'
 
 # Set a flag to indicate we're running in serverless mode
+# (src.main then uses the minimal 'serverless' pool profile and, unless
+# DB_INIT_MODE says otherwise, creates tables on the first request rather
+# than at import)
 os.environ['IS_SERVERLESS'] = 'true'
 
 # Now import and modify the Flask app AFTER all setup is complete
 try:
-    # Temporarily override functions that might fail in serverless
-    import src.main
-
-    # Store original functions
-    original_makedirs = os.makedirs
-    original_create_all = None
-
-    # Override makedirs to ignore directory creation errors
-    def safe_makedirs(path, *args, **kwargs):
-        try:
-            return original_makedirs(path, *args, **kwargs)
-        except (OSError, PermissionError):
-            pass  # Ignore in serverless environment
-
-    os.makedirs = safe_makedirs
-
-    # Import the app
+    # Import the app; in serverless mode schema setup waits for the first
+    # request (see DB_INIT_MODE in src/main.py)
     from src.main import app, db
 
-    # Restore original makedirs
-    os.makedirs = original_makedirs
-
-    # Override db.create_all to prevent it from running in serverless
-    # The database should already exist in production
-    original_create_all = db.create_all
-
-    def noop_create_all(*args, **kwargs):
-        pass  # Don't create tables in serverless
-
-    # Temporarily disable create_all during import
-    db.create_all = noop_create_all
-
-    # Re-initialize the app with serverless-safe configuration
-    @app.before_request
-    def before_request():
-        # Ensure database URL is properly configured for each request
-        if 'DATABASE_URL' in os.environ:
-            url = os.environ['DATABASE_URL']
-            if url.startswith("postgres://"):
-                url = url.replace("postgres://", "postgresql://", 1)
-            app.config['SQLALCHEMY_DATABASE_URI'] = url
-
-    # Add health check endpoint for Vercel
-    @app.route('/api/health')
-    def health_check():
-        try:
-            # Test database connection
-            from src.models.user import User
-            User.query.first()
-            db_status = 'connected'
-        except Exception as e:
-            db_status = f'error: {str(e)}'
-
-        return {
-            'status': 'healthy',
-            'database': db_status,
-            'environment': 'serverless'
-        }, 200
+    # /api/health comes from src.main; registering a second view under the
+    # same endpoint name made the import fail
 
     # Add debug endpoint for troubleshooting
     @app.route('/api/debug')
@@ -98,6 +49,7 @@ try:
                 'SECRET_KEY': bool(os.environ.get('SECRET_KEY')),
             },
             'database_uri': app.config.get('SQLALCHEMY_DATABASE_URI', 'not set')[:50] + '...',
+            'pool_profile': app.config.get('DB_POOL_PROFILE'),
             'sys_path': sys.path[:3]
         }, 200
 
@@ -125,15 +77,17 @@ except Exception as e:
     # If imports fail, create a minimal error response app
     import traceback
     from flask import Flask
+    init_error = e
+    init_traceback = traceback.format_exc()
     app = Flask(__name__)
 
     @app.route('/api/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     def import_error_handler(path):
         return {
             'error': 'Serverless Function Initialization Failed',
-            'message': str(e),
-            'type': e.__class__.__name__,
-            'traceback': traceback.format_exc(),
+            'message': str(init_error),
+            'type': init_error.__class__.__name__,
+            'traceback': init_traceback,
             'sys_path': sys.path[:5],
             'working_dir': os.getcwd(),
             'env_vars': {
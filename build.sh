@@ -23,8 +23,16 @@ cp -r ../school_store_frontend/dist/* src/static/
 echo "Installing Python dependencies..."
 pip install -r requirements.txt
 
+# Precompress the frontend so Flask can serve .gz/.br variants
+echo "Precompressing static assets..."
+python compress_static.py
+
 # Initialize the database
 echo "Initializing the database..."
 python init_database.py
 
+# Add any indexes missing from an existing database
+echo "Creating missing indexes..."
+python create_indexes.py
+
 echo "Build process completed successfully!"
\ No newline at end of file
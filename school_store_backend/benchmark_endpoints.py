@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite for the School Store backend.
+Generates a synthetic dataset, drives the main API flows through the Flask
+test client and reports throughput, p50/p99 latency and SQL statements per
+request. Each endpoint declares a query budget; the script exits non-zero if
+any request goes over it, so N+1 regressions are caught before deploy.
+
+Usage:
+    python benchmark_endpoints.py
+    python benchmark_endpoints.py --students 20000 --transactions 1000000 --iterations 500
+
+Environment Variables:
+    DATABASE_URL: database to generate into and benchmark against
+                  (defaults to a throwaway SQLite file)
+"""
+
+import os
+import sys
+import time
+import threading
+import argparse
+import tempfile
+
+# Add the backend directory to Python path
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, backend_dir)
+
+# Maximum SQL statements each endpoint may issue per request, once warm
+QUERY_BUDGETS = {
+    'login': 1,
+    'auth_me': 1,
+    'catalog': 0,
+    'purchase': 4,
+    'checkout': 8,
+    'award': 3,
+    'leaderboard': 0,
+    'purchase_history': 3,
+    'transaction_history': 2,
+    'transaction_history_cursor': 1,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark School Store API endpoints.')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--teachers', type=int, default=20)
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--purchases', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='requests per endpoint')
+    parser.add_argument('--keep-data', action='store_true',
+                        help='benchmark the existing DATABASE_URL data without regenerating')
+    return parser.parse_args()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """Counts SQL statements issued between reset() calls by the benchmark's thread.
+
+    The test client runs each request in the calling thread, so statements
+    from background threads (job workers, the log writer) are not counted.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.thread_id = threading.get_ident()
+
+    def __call__(self, *args):
+        if threading.get_ident() == self.thread_id:
+            self.count += 1
+
+    def reset(self):
+        self.count = 0
+        self.thread_id = threading.get_ident()
+
+
+def run_scenario(name, make_request, iterations, counter):
+    """Warm up once, then time each request and record its SQL statement count"""
+    response = make_request(0)
+    if response.status_code >= 400:
+        print(f"✗ {name}: warm-up request failed with {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return None
+
+    latencies = []
+    query_counts = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(1, iterations + 1):
+        counter.reset()
+        request_started = time.perf_counter()
+        response = make_request(i)
+        latencies.append(time.perf_counter() - request_started)
+        query_counts.append(counter.count)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'name': name,
+        'throughput': iterations / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'max_queries': max(query_counts),
+        'avg_queries': sum(query_counts) / len(query_counts),
+        'errors': errors,
+        'budget': QUERY_BUDGETS.get(name),
+    }
+
+
+def main():
+    args = parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        db_file = os.path.join(tempfile.mkdtemp(prefix='school-store-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+    # Benchmark the code paths, not the log writer or the background job poller
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('JOB_RUNNER', 'off')
+
+    print("=" * 78)
+    print("School Store Endpoint Benchmarks")
+    print("=" * 78)
+
+    import generate_data
+    from sqlalchemy import create_engine, event
+
+    if not args.keep_data:
+        gen_args = generate_data.parse_args([
+            '--students', str(args.students), '--teachers', str(args.teachers),
+            '--items', str(args.items), '--transactions', str(args.transactions),
+            '--purchases', str(args.purchases)])
+        engine = create_engine(os.environ['DATABASE_URL'])
+        generate_data.db.metadata.drop_all(engine)
+        generate_data.db.metadata.create_all(engine)
+        started = time.perf_counter()
+        generate_data.generate(engine, gen_args)
+        engine.dispose()
+        print(f"✓ Generated dataset in {time.perf_counter() - started:.1f}s "
+              f"({args.students} students, {args.transactions} transactions)")
+
+    from src.main import app
+    from src.models.user import db, User
+
+    counter = QueryCounter()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        teacher = User.query.filter_by(role='teacher').first()
+        students = User.query.filter_by(role='student')\
+            .order_by(User.points_balance.desc()).limit(50).all()
+        teacher_name = teacher.username
+        student_names = [student.username for student in students]
+        student_ids = [student.id for student in students]
+        password = 'student123'
+
+    def login(username):
+        client = app.test_client()
+        response = client.post('/api/auth/login', json={'username': username, 'password': password})
+        if response.status_code != 200:
+            print(f"✗ Could not log in as {username}: {response.status_code}")
+            sys.exit(1)
+        return client
+
+    student_client = login(student_names[0])
+    teacher_client = login(teacher_name)
+    buyers = [login(username) for username in student_names[:10]]
+
+    with app.app_context():
+        from src.models.store_item import StoreItem
+        item = StoreItem.query.filter_by(is_available=True).first()
+        item_id, size = item.id, item.get_available_sizes()[0]
+
+    # Give the buyers enough points for every purchase the benchmark makes
+    teacher_client.post('/api/points/award/bulk', json={
+        'user_ids': student_ids[:10], 'amount': 1000 * args.iterations, 'reason': 'Benchmark float'})
+
+    first_page = teacher_client.get('/api/points/transactions?limit=50').get_json()
+    cursor = first_page.get('next_cursor') or ''
+
+    scenarios = [
+        ('login', lambda i: app.test_client().post(
+            '/api/auth/login', json={'username': student_names[i % len(student_names)], 'password': password})),
+        ('auth_me', lambda i: student_client.get('/api/auth/me')),
+        ('catalog', lambda i: student_client.get('/api/store/items')),
+        ('purchase', lambda i: buyers[i % len(buyers)].post(
+            '/api/store/purchase', json={'item_id': item_id, 'quantity': 1, 'size': size})),
+        ('checkout', lambda i: buyers[i % len(buyers)].post(
+            '/api/store/checkout', json={'items': [{'item_id': item_id, 'quantity': 1, 'size': size}] * 3})),
+        ('award', lambda i: teacher_client.post(
+            '/api/points/award', json={'user_id': student_ids[i % len(student_ids)], 'amount': 5, 'reason': 'Benchmark'})),
+        ('leaderboard', lambda i: teacher_client.get('/api/points/leaderboard?limit=25')),
+        ('purchase_history', lambda i: student_client.get('/api/store/purchases?per_page=50')),
+        ('transaction_history', lambda i: teacher_client.get('/api/points/transactions?per_page=50')),
+        ('transaction_history_cursor', lambda i: teacher_client.get(
+            f'/api/points/transactions?limit=50&cursor={cursor}')),
+    ]
+
+    results = []
+    for name, make_request in scenarios:
+        # Password hashing makes login far slower than everything else
+        iterations = max(10, args.iterations // 10) if name == 'login' else args.iterations
+        result = run_scenario(name, make_request, iterations, counter)
+        if result is None:
+            sys.exit(1)
+        results.append(result)
+
+    print()
+    print(f"{'endpoint':<28}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'SQL avg':>9}{'SQL max':>9}{'budget':>8}")
+    print("-" * 81)
+    failures = []
+    for result in results:
+        budget = result['budget']
+        over = budget is not None and result['max_queries'] > budget
+        if over or result['errors']:
+            failures.append(result)
+        print(f"{result['name']:<28}{result['throughput']:>9.0f}{result['p50']:>9.2f}{result['p99']:>9.2f}"
+              f"{result['avg_queries']:>9.2f}{result['max_queries']:>9}{'-' if budget is None else budget:>8}"
+              f"{'  ✗' if over or result['errors'] else ''}")
+
+    print("=" * 81)
+    if failures:
+        for result in failures:
+            if result['errors']:
+                print(f"✗ {result['name']}: {result['errors']} request(s) failed")
+            if result['budget'] is not None and result['max_queries'] > result['budget']:
+                print(f"✗ {result['name']}: {result['max_queries']} SQL statements, budget is {result['budget']}")
+        sys.exit(1)
+    print("All endpoints within their query budgets.")
+    print("=" * 81)
+
+
+if __name__ == "__main__":
+    main()
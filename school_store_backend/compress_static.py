@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Static Asset Compression Script for School Store Backend
+Writes .gz (and .br, when the optional brotli package is installed) next to
+each compressible file of the built frontend in src/static, so the server
+can send precompressed bytes instead of compressing on every request.
+
+Usage:
+    python compress_static.py            # compress src/static
+    python compress_static.py --min-size 512
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Add the school_store_backend directory to Python path before imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.utils.static_assets import EXCLUDED_DIRS, compress_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.map',
+                           '.xml', '.ico', '.webmanifest'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Precompress the built frontend.')
+    parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       'src', 'static'))
+    parser.add_argument('--min-size', type=int, default=1024,
+                        help='skip files smaller than this many bytes')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.isdir(args.root):
+        logger.error(f"❌ Static folder not found: {args.root}")
+        sys.exit(1)
+    if brotli is None:
+        logger.info("brotli not installed; writing gzip variants only")
+
+    compressed = 0
+    original_bytes = 0
+    gzip_bytes = 0
+    for dirpath, dirnames, filenames in os.walk(args.root):
+        if dirpath == args.root:
+            dirnames[:] = [name for name in dirnames if name not in EXCLUDED_DIRS]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            size = os.path.getsize(path)
+            if size < args.min_size:
+                continue
+            compress_file(path, brotli)
+            compressed += 1
+            original_bytes += size
+            gzip_bytes += os.path.getsize(path + '.gz')
+
+    logger.info(f"✅ Compressed {compressed} files: {original_bytes:,} bytes -> "
+                f"{gzip_bytes:,} bytes gzip")
+
+
+if __name__ == '__main__':
+    main()
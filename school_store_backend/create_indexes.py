@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Index Management Script for School Store Backend
+Creates any indexes declared on the models that are missing from an existing
+database. Tables and data are left untouched, so it is safe to run against a
+live SQLite or PostgreSQL database.
+
+Usage:
+    python create_indexes.py            # create missing indexes
+    python create_indexes.py --dry-run  # only report what is missing
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string (defaults to local SQLite)
+"""
+
+import os
+import sys
+import logging
+
+# Add the school_store_backend directory to Python path before imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, inspect
+from src.models.user import db, User
+from src.models.store_item import StoreItem
+from src.models.purchase import Purchase
+from src.models.points_transaction import PointsTransaction
+from src.models.job import Job
+from src.models.reconciliation import ReconciliationRun, LedgerDrift
+from init_database import get_database_url
+
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def find_missing_indexes(engine):
+    """Return declared indexes whose table exists but which the database lacks."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            logger.warning(
+                f"⚠️ Table '{table.name}' not found, run init_database.py first")
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                logger.info(f"✅ Index '{index.name}' exists")
+            else:
+                missing.append(index)
+
+    return missing
+
+
+def create_indexes(engine, indexes):
+    """Create each index, skipping any that appeared in the meantime."""
+    created = 0
+    for index in indexes:
+        try:
+            index.create(engine, checkfirst=True)
+            logger.info(f"✅ Created index '{index.name}' on {index.table.name}")
+            created += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to create index '{index.name}': {e}")
+    return created
+
+
+def main():
+    """Main index management function."""
+    dry_run = '--dry-run' in sys.argv[1:]
+
+    logger.info("=" * 60)
+    logger.info("School Store Index Management")
+    logger.info("=" * 60)
+
+    DATABASE_URL = get_database_url()
+    logger.info(f"Database URL: {DATABASE_URL[:50]}...")
+
+    try:
+        engine = create_engine(DATABASE_URL)
+        missing = find_missing_indexes(engine)
+    except Exception as e:
+        logger.error(f"❌ Failed to inspect database: {e}")
+        sys.exit(1)
+
+    if not missing:
+        logger.info("✅ All declared indexes are present")
+        return
+
+    for index in missing:
+        columns = ', '.join(column.name for column in index.columns)
+        logger.info(f"➕ Missing index '{index.name}' on {index.table.name}({columns})")
+
+    if dry_run:
+        logger.info("Dry run, no indexes created")
+        return
+
+    created = create_indexes(engine, missing)
+    if created != len(missing):
+        sys.exit(1)
+
+    logger.info("=" * 60)
+    logger.info(f"✅ Created {created} index(es)")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
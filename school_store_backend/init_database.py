@@ -14,6 +14,8 @@ from src.models.user import db, User
 from src.models.store_item import StoreItem
 from src.models.purchase import Purchase
 from src.models.points_transaction import PointsTransaction
+from src.models.job import Job
+from src.models.reconciliation import ReconciliationRun, LedgerDrift
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine, text
 import os
@@ -67,6 +69,8 @@ def create_tables(engine):
         from src.models.store_item import StoreItem
         from src.models.purchase import Purchase
         from src.models.points_transaction import PointsTransaction
+        from src.models.job import Job
+        from src.models.reconciliation import ReconciliationRun, LedgerDrift
 
         # Create all tables
         db.metadata.create_all(engine)
@@ -82,7 +86,8 @@ def verify_tables(engine):
     try:
         with engine.connect() as conn:
             # Check for each table
-            tables = ['user', 'store_item', 'purchase', 'points_transaction']
+            tables = ['user', 'store_item', 'purchase', 'points_transaction', 'jobs',
+                      'reconciliation_runs', 'ledger_drifts']
             missing_tables = []
 
             for table in tables:
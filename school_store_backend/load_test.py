@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Local load generator replaying a "store opens" classroom event.
+Extends the single-student flow of test_purchase.py (login, fetch items,
+buy) to N students and M teachers hitting a running server at once:
+students log in, load /auth/me and the catalog, buy a few items and check
+their history; teachers award points and watch the leaderboard. Reports
+throughput, latency percentiles, error rates and lock contention per step,
+plus the share of server time spent in SQL from /api/metrics, read with
+the discovery teacher's login or --metrics-token.
+
+Accounts are discovered through /api/users with a teacher login, and every
+account is assumed to share one password (as generate_data.py creates them).
+
+Usage:
+    # terminal 1
+    python generate_data.py --students 2000 --reset
+    gunicorn --workers 4 --threads 4 src.main:app
+    # terminal 2
+    python load_test.py --url http://localhost:8000 --students 300 --teachers 10
+
+Only standard-library modules are used so it runs anywhere the backend does.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from collections import defaultdict
+
+# Response bodies that indicate the request waited on or lost a database lock
+CONTENTION_MARKERS = ('database is locked', 'could not obtain lock', 'deadlock',
+                      'Database connection error', 'Database operation failed')
+
+METRIC_LINE = re.compile(
+    r'^school_store_request_(duration_seconds_sum|duration_seconds_count|sql_seconds_total)'
+    r'\{endpoint="([^"]*)",method="([^"]*)"\} (\S+)$')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay classroom traffic against a local server.')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--students', type=int, default=100, help='concurrent students')
+    parser.add_argument('--teachers', type=int, default=5, help='concurrent teachers')
+    parser.add_argument('--purchases', type=int, default=3, help='purchases per student')
+    parser.add_argument('--awards', type=int, default=20, help='awards per teacher')
+    parser.add_argument('--ramp', type=float, default=5.0,
+                        help='seconds over which users arrive')
+    parser.add_argument('--username', default=None,
+                        help='teacher used to discover accounts (default: first teacher found)')
+    parser.add_argument('--password', default='student123')
+    parser.add_argument('--metrics-token', default=os.environ.get('METRICS_TOKEN'),
+                        help="server's METRICS_TOKEN (default: scrape /api/metrics as the teacher)")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=7)
+    return parser.parse_args()
+
+
+class Stats:
+    """Thread-safe latency and outcome counters per step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.contention = defaultdict(int)
+        self.rejected = defaultdict(int)
+
+    def record(self, step, elapsed, status, body):
+        with self._lock:
+            self.latencies[step].append(elapsed)
+            if status >= 500 or status == 0:
+                self.errors[step] += 1
+            elif status >= 400:
+                # Business rejections (e.g. insufficient points) are expected
+                self.rejected[step] += 1
+            # 503 is what the auth layer returns when the database is unreachable or busy
+            if status == 503 or any(marker in body for marker in CONTENTION_MARKERS):
+                self.contention[step] += 1
+
+
+class Client:
+    """Cookie-keeping HTTP client, one per simulated user"""
+
+    def __init__(self, base_url, stats, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.etags = {}
+
+    def request(self, step, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        if method == 'GET' and path in self.etags:
+            req.add_header('If-None-Match', self.etags[path])
+
+        started = time.perf_counter()
+        status, body, etag = 0, '', None
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status = response.status
+                body = response.read().decode('utf-8', 'replace')
+                etag = response.headers.get('ETag')
+        except urllib.error.HTTPError as e:
+            status = e.code
+            body = e.read().decode('utf-8', 'replace')
+        except (urllib.error.URLError, OSError) as e:
+            body = str(e)
+        elapsed = time.perf_counter() - started
+
+        # 304 Not Modified is a successful, cheap catalog load
+        self.stats.record(step, elapsed, 200 if status == 304 else status, body)
+        if etag:
+            self.etags[path] = etag
+        try:
+            return status, json.loads(body) if body and status != 304 else None
+        except ValueError:
+            return status, None
+
+
+def discover_accounts(args):
+    """Log in as a teacher and list the accounts and items to use.
+
+    Returns the students, teachers and products, plus the logged-in teacher
+    client for scraping /api/metrics.
+    """
+    client = Client(args.url, Stats(), args.timeout)
+    users_status = None
+    teachers = [args.username] if args.username else []
+    for username in teachers or ['teacher1', 'teacher']:
+        status, _ = client.request('setup', 'POST', '/api/auth/login',
+                                   {'username': username, 'password': args.password})
+        if status == 200:
+            users_status, users = client.request('setup', 'GET', '/api/users')
+            break
+    if users_status != 200:
+        print("✗ Could not log in as a teacher to discover accounts; pass --username")
+        sys.exit(1)
+
+    students = [user for user in users if user['role'] == 'student']
+    teachers = [user for user in users if user['role'] == 'teacher']
+    _, items = client.request('setup', 'GET', '/api/store/items')
+    products = [(item['id'], size) for item in items or [] for size in item['available_sizes']]
+    if not students or not teachers or not products:
+        print("✗ Need at least one student, one teacher and one available item")
+        sys.exit(1)
+    return students, teachers, products, client
+
+
+def student_flow(args, stats, account, products, rng):
+    client = Client(args.url, stats, args.timeout)
+    status, _ = client.request('login', 'POST', '/api/auth/login',
+                               {'username': account['username'], 'password': args.password})
+    if status != 200:
+        return
+    client.request('auth_me', 'GET', '/api/auth/me')
+    client.request('catalog', 'GET', '/api/store/items')
+    for _ in range(args.purchases):
+        item_id, size = rng.choice(products)
+        client.request('purchase', 'POST', '/api/store/purchase',
+                       {'item_id': item_id, 'size': size, 'quantity': 1})
+        # Browsers revalidate the catalog between purchases
+        client.request('catalog', 'GET', '/api/store/items')
+    client.request('purchase_history', 'GET', '/api/store/purchases?limit=20')
+
+
+def teacher_flow(args, stats, account, students, rng):
+    client = Client(args.url, stats, args.timeout)
+    status, _ = client.request('login', 'POST', '/api/auth/login',
+                               {'username': account['username'], 'password': args.password})
+    if status != 200:
+        return
+    for i in range(args.awards):
+        student = rng.choice(students)
+        client.request('award', 'POST', '/api/points/award',
+                       {'user_id': student['id'], 'amount': 50, 'reason': 'Load test'})
+        if i % 5 == 0:
+            client.request('leaderboard', 'GET', '/api/points/leaderboard?limit=10')
+
+
+def scrape_metrics(args, client):
+    """Read per-endpoint request and SQL seconds from /api/metrics.
+
+    Sends --metrics-token if given, else the teacher client's session.
+    Returns {(endpoint, method): [request_seconds, sql_seconds, requests]}, or
+    None if the server does not answer or refuses. With several workers this
+    only sees whichever worker serves the scrape.
+    """
+    req = urllib.request.Request(args.url.rstrip('/') + '/api/metrics')
+    if args.metrics_token:
+        req.add_header('Authorization', f'Bearer {args.metrics_token}')
+    try:
+        with client.opener.open(req, timeout=args.timeout) as response:
+            text = response.read().decode()
+    except (urllib.error.URLError, OSError):
+        return None
+
+    totals = defaultdict(lambda: [0.0, 0.0, 0])
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, endpoint, method, value = match.groups()
+        key = (endpoint, method)
+        if name == 'duration_seconds_sum':
+            totals[key][0] = float(value)
+        elif name == 'sql_seconds_total':
+            totals[key][1] = float(value)
+        elif name == 'duration_seconds_count':
+            totals[key][2] = int(float(value))
+    return totals
+
+
+def report_sql_share(before, after):
+    """Print how much of each write endpoint's server time went to SQL.
+
+    On SQLite a write waits for the database lock inside the statement, so
+    a rising SQL share under load is lock contention rather than slow queries.
+    """
+    if before is None or after is None:
+        print("(server metrics unavailable; skipping SQL time breakdown)")
+        return
+    print()
+    print(f"{'server endpoint':<36}{'requests':>9}{'avg ms':>9}{'SQL ms':>9}{'SQL share':>11}")
+    print("-" * 74)
+    for key in sorted(after):
+        seconds, sql_seconds, count = (a - b for a, b in zip(after[key], before.get(key, (0.0, 0.0, 0))))
+        if count <= 0 or key[1] != 'POST':
+            continue
+        print(f"{key[0]:<36}{count:>9}{seconds / count * 1000:>9.1f}{sql_seconds / count * 1000:>9.1f}"
+              f"{sql_seconds / max(seconds, 1e-9):>11.0%}")
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def report(stats, elapsed):
+    print()
+    print(f"{'step':<18}{'requests':>9}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'errors':>8}{'4xx':>6}{'locks':>7}")
+    print("-" * 92)
+    total = 0
+    for step in sorted(stats.latencies):
+        latencies = sorted(stats.latencies[step])
+        total += len(latencies)
+        print(f"{step:<18}{len(latencies):>9}{len(latencies) / elapsed:>8.1f}"
+              f"{percentile(latencies, 0.50) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>9.1f}{latencies[-1] * 1000:>9.1f}"
+              f"{stats.errors[step]:>8}{stats.rejected[step]:>6}{stats.contention[step]:>7}")
+    print("-" * 92)
+    errors = sum(stats.errors.values())
+    print(f"{total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, "
+          f"{errors} errors ({errors / max(total, 1):.2%}), "
+          f"{sum(stats.contention.values())} lock-contention failures")
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    print("=" * 92)
+    print(f"Store-opens load test against {args.url}")
+    print("=" * 92)
+
+    students, teachers, products, setup_client = discover_accounts(args)
+    student_accounts = rng.sample(students, min(args.students, len(students)))
+    teacher_accounts = rng.sample(teachers, min(args.teachers, len(teachers)))
+    print(f"✓ {len(student_accounts)} students and {len(teacher_accounts)} teachers, "
+          f"{len(products)} purchasable item sizes, arriving over {args.ramp:.0f}s")
+
+    stats = Stats()
+    metrics_before = scrape_metrics(args, setup_client)
+    threads = []
+    for account in student_accounts:
+        threads.append(threading.Thread(target=student_flow, args=(
+            args, stats, account, products, random.Random(rng.random()))))
+    for account in teacher_accounts:
+        threads.append(threading.Thread(target=teacher_flow, args=(
+            args, stats, account, students, random.Random(rng.random()))))
+    delays = sorted(rng.random() * args.ramp for _ in threads)
+
+    started = time.perf_counter()
+    for thread, delay in zip(threads, delays):
+        wait = started + delay - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report(stats, elapsed)
+    report_sql_share(metrics_before, scrape_metrics(args, setup_client))
+    print("=" * 92)
+    sys.exit(1 if sum(stats.errors.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Ledger Reconciliation Script for School Store Backend
+Checks every user's points_balance against the PointsTransaction ledger
+(SUM(earned) - SUM(spent)) in chunks of user ids, reports the accounts that
+disagree and optionally repairs them. Progress is checkpointed after each
+chunk, so an interrupted run can be resumed where it stopped.
+
+Usage:
+    python reconcile_ledger.py                   # report drift only
+    python reconcile_ledger.py --repair balance  # set balances to the ledger total
+    python reconcile_ledger.py --repair ledger   # post adjusting transactions instead
+    python reconcile_ledger.py --resume 12       # continue run 12 from its checkpoint
+
+Environment Variables:
+    DATABASE_URL: PostgreSQL connection string (defaults to local SQLite)
+    RECONCILE_CHUNK_SIZE: user ids per chunk (default 1000)
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Add the school_store_backend directory to Python path before imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.reconciliation import LedgerDrift
+from src.services.reconciliation import REPAIR_MODES, reconcile, start_run
+
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Drifted accounts listed at the end of a run; the rest are in the report API
+MAX_LISTED_DRIFTS = 50
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Reconcile points balances with the ledger.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--repair', choices=REPAIR_MODES,
+                       help='repair drifted accounts (default: report only)')
+    group.add_argument('--resume', type=int, metavar='RUN_ID',
+                       help='continue an interrupted run')
+    parser.add_argument('--chunk-size', type=int, help='user ids per chunk')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with app.app_context():
+        run_id = args.resume or start_run(args.repair, chunk_size=args.chunk_size).id
+        logger.info(f"Reconciliation run {run_id}")
+
+        def progress(done, total):
+            logger.info(f"Checked users up to id {done:,} of {total:,}")
+
+        try:
+            run = reconcile(run_id, progress)
+        except Exception as e:
+            logger.error(f"❌ Reconciliation failed: {e}")
+            logger.error(f"Resume with: python reconcile_ledger.py --resume {run_id}")
+            sys.exit(1)
+
+        if run.status != 'completed':
+            logger.warning(f"Run {run.id} is being processed by another worker")
+            sys.exit(1)
+        # Running servers pick up repaired balances on their next leaderboard refresh
+
+        drifts = LedgerDrift.query.filter_by(run_id=run.id)\
+            .order_by(LedgerDrift.user_id).limit(MAX_LISTED_DRIFTS).all()
+        for drift in drifts:
+            logger.info(f"  user {drift.user_id}: balance {drift.points_balance}, "
+                        f"ledger {drift.ledger_balance}"
+                        f"{' (repaired)' if drift.repaired else ''}")
+        if run.drifted > len(drifts):
+            logger.info(f"  ... and {run.drifted - len(drifts)} more")
+
+        status = "✅" if run.drifted == run.repaired else "❌"
+        logger.info(f"{status} Checked {run.users_checked:,} users: "
+                    f"{run.drifted} drifted, {run.repaired} repaired")
+        if run.drifted != run.repaired:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,34 +1,48 @@
 from src.routes.store import store_bp
 from src.routes.points import points_bp
 from src.routes.user import user_bp
+from src.routes.export import export_bp
+from src.routes.uploads import uploads_bp
+from src.routes.jobs import jobs_bp
+from src.services.jobs import job_runner
+from src.utils.metrics import metrics
+from src.utils.db_pool import configure_database, init_engine_events, is_serverless, pool_stats
+from src.utils.log import configure_logging
+from src.utils.static_assets import StaticManifest
 from src.models.purchase import Purchase
 from src.models.points_transaction import PointsTransaction
 from src.models.store_item import StoreItem
+from src.models.job import Job
+from src.models.reconciliation import ReconciliationRun, LedgerDrift
 from src.models.user import db
 from flask_cors import CORS
-from flask import Flask, send_from_directory
+from flask import Flask, request
 import os
 import sys
 import logging
+import threading
 from sqlalchemy import text
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (structured JSON, written by a background thread)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
 app = Flask(__name__, static_folder=os.path.join(
     os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+# Reject oversized request bodies before they are read; large images go
+# through the chunked upload API instead
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
 
 # Enable CORS for all routes
 CORS(app,
      resources={r"/api/*": {
          "origins": "*",
-         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization"],
+         "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+         "allow_headers": ["Content-Type", "Authorization", "Upload-Offset"],
          "supports_credentials": True
      }},
      supports_credentials=True)
@@ -37,29 +51,48 @@ CORS(app,
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(points_bp, url_prefix='/api')
 app.register_blueprint(store_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+app.register_blueprint(uploads_bp)
 
-# Database configuration
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Per-endpoint latency and SQL metrics, served at /api/metrics to teachers
+# and to scrapers holding METRICS_TOKEN
+metrics.init_app(app)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Database configuration; the pooling profile (pooled, serverless or sqlite)
+# is chosen from the environment, see src/utils/db_pool.py
+app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+pool_profile = configure_database(app, os.environ.get('DATABASE_URL'))
 
 # Initialize database with proper error handling
 try:
     db.init_app(app)
+    with app.app_context():
+        init_engine_events(db.engine, pool_profile)
+    metrics.add_collector(lambda: pool_stats.render(db.engine.pool, pool_profile))
     logger.info(
-        f"Database initialized with URI: {app.config['SQLALCHEMY_DATABASE_URI'][:50]}...")
+        f"Database initialized with URI: {app.config['SQLALCHEMY_DATABASE_URI'][:50]}... "
+        f"(pool profile: {pool_profile})")
 except Exception as e:
     logger.error(f"Failed to initialize database: {e}")
     # Continue running without database - app will handle errors gracefully
 
-# Create uploads directory
-uploads_dir = os.path.join(os.path.dirname(__file__), 'static', 'uploads')
-os.makedirs(uploads_dir, exist_ok=True)
+# Background jobs (roster imports, exports, image resizing) run in worker
+# threads started with the first request; see src/services/jobs.py
+job_runner.init_app(app)
 
-# Attempt to create tables, but don't fail if database isn't ready
+# Schema setup mode:
+#   eager  check the connection and create tables while importing (default)
+#   lazy   do the same on the first request, retrying until it succeeds
+#   skip   never; only for deployments that run init_database.py themselves
+#          (Render's build does; Vercel's build only builds the frontend)
+# Serverless defaults to lazy: the import makes no database round trips and
+# the tables are still created, by the first request of each instance.
+# The uploads directory is created by the upload route when first needed.
+DB_INIT_MODE = os.environ.get('DB_INIT_MODE') or ('lazy' if is_serverless() else 'eager')
+_init_lock = threading.Lock()
+database_ready = False
 
 
 def init_database():
@@ -82,16 +115,30 @@ def init_database():
         return False
 
 
-# Try to initialize database but don't fail the app if it doesn't work
-database_ready = init_database()
+def ensure_database():
+    """Run init_database() once, on the first request that finds it not done"""
+    global database_ready
+    if database_ready:
+        return
+    with _init_lock:
+        if not database_ready:
+            database_ready = init_database()
+
+
+if DB_INIT_MODE == 'lazy':
+    app.before_request(ensure_database)
+elif DB_INIT_MODE != 'skip':
+    # Try to initialize database but don't fail the app if it doesn't work
+    database_ready = init_database()
+
+
+# Manifest of the built frontend, scanned on first use
+static_assets = StaticManifest(app.static_folder)
 
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    # DEBUG: Log incoming path
-    print(f"[DEBUG] serve() called with path: '{path}'", flush=True)
-
     static_folder_path = app.static_folder
     if static_folder_path is None:
         return "Static folder not configured", 404
@@ -100,38 +147,40 @@ def serve(path):
     # The issue was that path.startswith('api/') was catching all API routes
     # and returning 404 before they could reach the blueprints
     if path.startswith('api/'):
-        print(
-            f"[DEBUG] Path starts with 'api/', NOT serving static - letting Flask handle it", flush=True)
         # Instead of returning 404, we need to let Flask continue routing
         # The blueprints registered with /api prefix will handle these
         from werkzeug.exceptions import NotFound
         raise NotFound()  # This lets Flask continue looking for matching routes
 
-    # Try to serve the file if it exists
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        print(f"[DEBUG] Serving static file: {path}", flush=True)
-        return send_from_directory(static_folder_path, path)
+    # Built frontend files come from the manifest; hashed bundles are immutable
+    asset = static_assets.get(path) if path else None
+    if asset is not None:
+        return static_assets.send(asset, request)
 
-    # For any non-file route, serve index.html (React SPA routing)
-    index_path = os.path.join(static_folder_path, 'index.html')
-    if os.path.exists(index_path):
-        print(f"[DEBUG] Serving index.html for SPA route: {path}", flush=True)
-        return send_from_directory(static_folder_path, 'index.html')
+    # For any non-file route, serve index.html (React SPA routing) with its ETag
+    index = static_assets.get('index.html')
+    if index is not None:
+        return static_assets.send(index, request)
     else:
         return "index.html not found - please run build script", 404
 
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return {"error": "Request body too large"}, 413
+
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint with database status."""
-    print("[DEBUG] Health check endpoint called", flush=True)
-
     # Check database connectivity
     db_status = "connected"
+    pool_status = {'profile': pool_profile}
     try:
         with app.app_context():
             db.session.execute(text("SELECT 1"))
             db.session.commit()
+            pool_status.update(pool_stats.snapshot(db.engine.pool))
     except Exception as e:
         db_status = f"error: {str(e)[:100]}"
         logger.error(f"Database health check failed: {e}")
@@ -139,7 +188,8 @@ def health_check():
     return {
         "status": "healthy",
         "message": "School Store API is running",
-        "database": db_status
+        "database": db_status,
+        "database_pool": pool_status
     }, 200
 
 
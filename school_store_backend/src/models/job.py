@@ -0,0 +1,51 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers claim the oldest queued job
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.Enum('queued', 'running', 'succeeded', 'failed',
+                               name='job_statuses'), nullable=False, default='queued')
+    payload = db.Column(db.Text)  # JSON arguments; cleared once the job finishes
+    result = db.Column(db.Text)  # JSON returned by the handler
+    error = db.Column(db.Text)
+    progress_current = db.Column(db.Integer, default=0)
+    progress_total = db.Column(db.Integer)
+    progress_message = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, default=0)
+    locked_by = db.Column(db.String(100))  # Worker running the job
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.id}: {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': {
+                'current': self.progress_current or 0,
+                'total': self.progress_total,
+                'message': self.progress_message
+            },
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
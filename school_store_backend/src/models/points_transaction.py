@@ -3,6 +3,14 @@ from datetime import datetime
 
 class PointsTransaction(db.Model):
     __tablename__ = 'points_transactions'
+    __table_args__ = (
+        # Per-student history, newest first
+        db.Index('ix_points_transactions_user_id_created_at', 'user_id', 'created_at'),
+        # Points awarded by a teacher
+        db.Index('ix_points_transactions_created_by', 'created_by'),
+        # Whole-school ledger, newest first (page and cursor modes)
+        db.Index('ix_points_transactions_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
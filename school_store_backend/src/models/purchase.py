@@ -4,6 +4,12 @@ from datetime import datetime
 
 class Purchase(db.Model):
     __tablename__ = 'purchases'
+    __table_args__ = (
+        # Per-student purchase history, newest first
+        db.Index('ix_purchases_user_id_created_at', 'user_id', 'created_at'),
+        # All purchases for teachers, newest first (page and cursor modes)
+        db.Index('ix_purchases_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -0,0 +1,69 @@
+from src.models.user import db
+from datetime import datetime
+
+
+class ReconciliationRun(db.Model):
+    """One pass comparing every points_balance with its ledger, resumable by id"""
+    __tablename__ = 'reconciliation_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.Enum('running', 'completed', 'failed',
+                               name='reconciliation_statuses'), nullable=False, default='running')
+    repair = db.Column(db.String(20))  # None (report only), 'balance' or 'ledger'
+    chunk_size = db.Column(db.Integer, nullable=False)
+    max_user_id = db.Column(db.Integer, nullable=False, default=0)  # Users created later are skipped
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)  # Checkpoint: users up to here are done
+    users_checked = db.Column(db.Integer, nullable=False, default=0)
+    drifted = db.Column(db.Integer, nullable=False, default=0)
+    repaired = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ReconciliationRun {self.id}: {self.status} at user {self.last_user_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'repair': self.repair,
+            'chunk_size': self.chunk_size,
+            'max_user_id': self.max_user_id,
+            'last_user_id': self.last_user_id,
+            'users_checked': self.users_checked,
+            'drifted': self.drifted,
+            'repaired': self.repaired,
+            'error': self.error,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class LedgerDrift(db.Model):
+    """An account whose points_balance disagreed with its ledger during a run"""
+    __tablename__ = 'ledger_drifts'
+    __table_args__ = (
+        # A run's report, in user order
+        db.Index('ix_ledger_drifts_run_id_user_id', 'run_id', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('reconciliation_runs.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    points_balance = db.Column(db.Integer, nullable=False)
+    ledger_balance = db.Column(db.Integer, nullable=False)  # SUM(earned) - SUM(spent)
+    repaired = db.Column(db.Boolean, nullable=False, default=False)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'points_balance': self.points_balance,
+            'ledger_balance': self.ledger_balance,
+            'difference': self.points_balance - self.ledger_balance,
+            'repaired': self.repaired
+        }
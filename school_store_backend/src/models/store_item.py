@@ -1,10 +1,16 @@
 from src.models.user import db
+from src.services.image_store import variant_urls
 from datetime import datetime
 import json
 
 
 class StoreItem(db.Model):
     __tablename__ = 'store_items'
+    __table_args__ = (
+        # Catalog listing: available items, optionally by category, sorted by name
+        db.Index('ix_store_items_is_available_category_name',
+                 'is_available', 'category', 'name'),
+    )
 
     # Fixed size pricing constants
     SIZE_PRICES = {
@@ -75,6 +81,8 @@ class StoreItem(db.Model):
             'available_sizes': self.get_available_sizes(),
             'size_pricing': self.get_size_pricing(),
             'image_url': self.image_url,
+            # thumb/card/full URLs; the catalog grid should use 'card' or 'thumb'
+            'image_variants': variant_urls(self.image_url),
             'category': self.category,
             'is_available': self.is_available,
             'created_at': self.created_at.isoformat() if self.created_at else None,
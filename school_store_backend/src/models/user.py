@@ -6,6 +6,11 @@ db = SQLAlchemy()
 
 
 class User(db.Model):
+    __table_args__ = (
+        # Leaderboard: students ordered by balance
+        db.Index('ix_user_role_points_balance', 'role', 'points_balance'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
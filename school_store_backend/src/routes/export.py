@@ -0,0 +1,191 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from src.models.user import User, db
+from src.models.purchase import Purchase
+from src.models.store_item import StoreItem
+from src.models.points_transaction import PointsTransaction
+from src.routes.jobs import job_accepted
+from src.services.jobs import job_file_path, job_handler, submit_job
+from src.utils.auth import current_user_id, teacher_required
+from datetime import datetime, timedelta
+from sqlalchemy.orm import aliased
+from werkzeug.datastructures import MultiDict
+import csv
+import io
+import json
+
+export_bp = Blueprint('export', __name__)
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+def parse_export_filters(args):
+    """Read start, end and user_id filters; a bare end date includes that whole day"""
+    start = args.get('start')
+    end = args.get('end')
+    filters = {'user_id': args.get('user_id', type=int)}
+    try:
+        filters['start'] = datetime.fromisoformat(start) if start else None
+        filters['end'] = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        raise ValueError('start and end must be ISO dates, e.g. 2025-06-30')
+    if end and len(end) == 10:
+        filters['end'] += timedelta(days=1)
+    return filters
+
+def stream_rows(query, columns, fmt):
+    """Yield the query's rows as CSV or NDJSON text chunks.
+
+    Rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE, and
+    each batch is written out before the next is fetched, so memory stays
+    flat however many rows are exported.
+    """
+    rows = db.session.execute(
+        query.statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+
+    for partition in rows.partitions():
+        for row in partition:
+            values = [value.isoformat() if isinstance(value, datetime) else value
+                      for value in row]
+            if writer:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values))) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_format(args):
+    fmt = args.get('format', 'csv').lower()
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError('format must be csv or ndjson')
+    return fmt
+
+def export_filename(name, fmt):
+    timestamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    return f'{name}-{timestamp}.{fmt}'
+
+def export_mimetype(fmt):
+    return 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+
+def transactions_query(filters):
+    student = aliased(User)
+    teacher = aliased(User)
+    query = db.session.query(
+        PointsTransaction.id,
+        PointsTransaction.created_at,
+        PointsTransaction.user_id,
+        student.first_name,
+        student.last_name,
+        PointsTransaction.transaction_type,
+        PointsTransaction.amount,
+        PointsTransaction.reason,
+        PointsTransaction.reference_id,
+        PointsTransaction.created_by,
+        teacher.username
+    ).outerjoin(student, PointsTransaction.user_id == student.id)\
+        .outerjoin(teacher, PointsTransaction.created_by == teacher.id)
+
+    if filters['user_id']:
+        query = query.filter(PointsTransaction.user_id == filters['user_id'])
+    if filters['start']:
+        query = query.filter(PointsTransaction.created_at >= filters['start'])
+    if filters['end']:
+        query = query.filter(PointsTransaction.created_at < filters['end'])
+
+    return query.order_by(PointsTransaction.created_at, PointsTransaction.id)
+
+def purchases_query(filters):
+    query = db.session.query(
+        Purchase.id,
+        Purchase.created_at,
+        Purchase.user_id,
+        User.first_name,
+        User.last_name,
+        Purchase.item_id,
+        StoreItem.name,
+        Purchase.size,
+        Purchase.quantity,
+        Purchase.total_cost,
+        Purchase.status
+    ).outerjoin(User, Purchase.user_id == User.id)\
+        .outerjoin(StoreItem, Purchase.item_id == StoreItem.id)
+
+    if filters['user_id']:
+        query = query.filter(Purchase.user_id == filters['user_id'])
+    if filters['start']:
+        query = query.filter(Purchase.created_at >= filters['start'])
+    if filters['end']:
+        query = query.filter(Purchase.created_at < filters['end'])
+
+    return query.order_by(Purchase.created_at, Purchase.id)
+
+# Export name -> (query builder, column headers, file name prefix)
+EXPORTS = {
+    'transactions': (transactions_query,
+                     ['id', 'created_at', 'user_id', 'first_name', 'last_name',
+                      'transaction_type', 'amount', 'reason', 'reference_id',
+                      'created_by', 'teacher_username'],
+                     'points-transactions'),
+    'purchases': (purchases_query,
+                  ['id', 'created_at', 'user_id', 'first_name', 'last_name',
+                   'item_id', 'item_name', 'size', 'quantity', 'total_cost', 'status'],
+                  'purchases'),
+}
+
+def export_response(export):
+    """Stream the export, or with ?async=1 hand it to a background job"""
+    try:
+        filters = parse_export_filters(request.args)
+        fmt = export_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('async') in ('1', 'true'):
+        payload = {key: request.args.get(key) for key in ('start', 'end', 'user_id', 'format')}
+        payload['export'] = export
+        return job_accepted(submit_job('export', payload, current_user_id()))
+
+    build_query, columns, name = EXPORTS[export]
+    return Response(
+        stream_with_context(stream_rows(build_query(filters), columns, fmt)),
+        mimetype=export_mimetype(fmt),
+        headers={'Content-Disposition': f'attachment; filename={export_filename(name, fmt)}'}
+    )
+
+@job_handler('export')
+def run_export(payload, context):
+    """Write an export to a file for /api/jobs/<id>/download"""
+    args = MultiDict({key: value for key, value in payload.items() if value is not None})
+    filters = parse_export_filters(args)
+    fmt = export_format(args)
+    build_query, columns, name = EXPORTS[payload['export']]
+
+    filename = export_filename(name, fmt)
+    lines = 0
+    with open(job_file_path(context.job_id, filename), 'w', newline='') as f:
+        for chunk in stream_rows(build_query(filters), columns, fmt):
+            f.write(chunk)
+            lines += chunk.count('\n')
+            context.progress(lines, message=f'{lines} lines written')
+
+    return {'filename': filename, 'mimetype': export_mimetype(fmt),
+            'download_url': f'/api/jobs/{context.job_id}/download'}
+
+# Export Routes
+@export_bp.route('/export/transactions', methods=['GET'])
+@teacher_required
+def export_transactions():
+    return export_response('transactions')
+
+@export_bp.route('/export/purchases', methods=['GET'])
+@teacher_required
+def export_purchases():
+    return export_response('purchases')
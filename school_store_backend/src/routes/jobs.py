@@ -0,0 +1,75 @@
+from flask import Blueprint, jsonify, request, send_file
+from src.models.user import db
+from src.models.job import Job
+from src.services.jobs import job_file_path
+from src.utils.auth import current_claims, login_required, teacher_required
+import os
+
+jobs_bp = Blueprint('jobs', __name__)
+
+MAX_JOB_LIST = 100
+
+
+def load_visible_job(job_id):
+    """Return the job if the current user may see it (its creator, or any teacher)"""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return None
+    claims = current_claims()
+    if claims['role'] != 'teacher' and job.created_by != claims['uid']:
+        return None
+    return job
+
+
+def job_accepted(job_id, **fields):
+    """202 response for a request whose work was handed to a background job"""
+    return jsonify({
+        'message': 'Job queued',
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}',
+        **fields
+    }), 202
+
+
+@jobs_bp.route('/jobs', methods=['GET'])
+@teacher_required
+def list_jobs():
+    # Get query parameters
+    status = request.args.get('status')
+    kind = request.args.get('kind')
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_JOB_LIST))
+
+    query = Job.query
+    if status:
+        query = query.filter(Job.status == status)
+    if kind:
+        query = query.filter(Job.kind == kind)
+
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify([job.to_dict() for job in jobs])
+
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    job = load_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+@login_required
+def download_job_result(job_id):
+    job = load_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'succeeded':
+        return jsonify({'error': f'Job is {job.status}', 'status': job.status}), 409
+
+    result = job.to_dict()['result'] or {}
+    path = job_file_path(job.id, result['filename']) if result.get('filename') else None
+    if not path or not os.path.isfile(path):
+        return jsonify({'error': 'Job has no downloadable file'}), 404
+    return send_file(path, mimetype=result.get('mimetype'), as_attachment=True,
+                     download_name=result.get('filename'))
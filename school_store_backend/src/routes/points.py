@@ -1,35 +1,26 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, request
 from src.models.user import User, db
 from src.models.points_transaction import PointsTransaction
-from functools import wraps
+from src.models.reconciliation import LedgerDrift, ReconciliationRun
+from src.routes.jobs import job_accepted
+from src.utils.auth import current_user_id, load_current_user, login_required, teacher_required
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from src.services.points_ledger import credit_balances
+from src.services.leaderboard import leaderboard
+from src.services.jobs import job_handler, submit_job
+from src.services.reconciliation import reconcile, start_run
+from src.utils.pagination import keyset_page, wants_cursor
 
 points_bp = Blueprint('points', __name__)
 
-# Authentication decorators (duplicated for modularity)
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-def teacher_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        user = User.query.get(session['user_id'])
-        if not user or user.role != 'teacher':
-            return jsonify({'error': 'Teacher access required'}), 403
-        return f(*args, **kwargs)
-    return decorated_function
-
 # Points Management Routes
 @points_bp.route('/points/<int:user_id>', methods=['GET'])
 @login_required
 def get_user_points(user_id):
-    current_user = User.query.get(session['user_id'])
+    current_user = load_current_user()
+    if current_user is None:
+        return jsonify({'error': 'Authentication required'}), 401
     
     # Students can only view their own points
     if current_user.role == 'student' and current_user.id != user_id:
@@ -47,7 +38,7 @@ def get_user_points(user_id):
 @teacher_required
 def award_points():
     data = request.json
-    teacher_id = session['user_id']
+    teacher_id = current_user_id()
     
     # Validate required fields
     required_fields = ['user_id', 'amount', 'reason']
@@ -76,33 +67,143 @@ def award_points():
         created_by=teacher_id
     )
     
-    # Update student's points balance
-    student.points_balance += amount
+    # Add to the balance with an atomic SQL increment, so a purchase debiting
+    # the same student concurrently can't be overwritten
+    student_id = student.id
+    new_balance = credit_balances({student_id: amount})[student_id]
     
     db.session.add(transaction)
+    db.session.flush()
+    
+    # Serialize before commit expires the loaded rows
+    transaction_dict = transaction.to_dict()
+    db.session.commit()
+    leaderboard.update_balance(student_id, new_balance)
+    
+    return jsonify({
+        'message': 'Points awarded successfully',
+        'transaction': transaction_dict,
+        'new_balance': new_balance
+    }), 201
+
+# Largest class roster accepted by a single bulk award
+MAX_BULK_AWARDS = 1000
+
+@points_bp.route('/points/award/bulk', methods=['POST'])
+@teacher_required
+def award_points_bulk():
+    """Award points to many students at once.
+
+    Accepts either {"awards": [{"user_id", "amount", "reason"}, ...]} or
+    {"user_ids": [...], "amount": n, "reason": "..."}. Every award is
+    validated up front and all of them are written in one transaction.
+    """
+    data = request.json or {}
+    teacher_id = current_user_id()
+    
+    if 'awards' in data:
+        awards = data['awards']
+    elif 'user_ids' in data:
+        for field in ['amount', 'reason']:
+            if field not in data:
+                return jsonify({'error': f'{field} is required'}), 400
+        if not isinstance(data['user_ids'], list):
+            return jsonify({'error': 'user_ids must be a list'}), 400
+        awards = [{'user_id': user_id, 'amount': data['amount'], 'reason': data['reason']}
+                  for user_id in data['user_ids']]
+    else:
+        return jsonify({'error': 'awards or user_ids is required'}), 400
+    
+    if not isinstance(awards, list) or not awards:
+        return jsonify({'error': 'At least one award is required'}), 400
+    if len(awards) > MAX_BULK_AWARDS:
+        return jsonify({'error': f'At most {MAX_BULK_AWARDS} awards per request'}), 400
+    
+    # Validate every award before touching the database
+    errors = []
+    for index, award in enumerate(awards):
+        if not isinstance(award, dict):
+            errors.append({'index': index, 'error': 'Award must be an object'})
+            continue
+        missing = [field for field in ['user_id', 'amount', 'reason'] if field not in award]
+        if missing:
+            errors.append({'index': index, 'error': f'{missing[0]} is required'})
+        elif any(not isinstance(award[field], int) or isinstance(award[field], bool)
+                 for field in ['user_id', 'amount']):
+            errors.append({'index': index, 'error': 'user_id and amount must be integers'})
+        elif award['amount'] <= 0:
+            errors.append({'index': index, 'error': 'Amount must be positive'})
+        elif not isinstance(award['reason'], str) or not award['reason'].strip():
+            errors.append({'index': index, 'error': 'reason must be a non-empty string'})
+    if errors:
+        return jsonify({'error': 'Invalid awards', 'details': errors}), 400
+    
+    # Check every recipient is a student with one query
+    user_ids = {award['user_id'] for award in awards}
+    student_ids = {row[0] for row in db.session.query(User.id)
+                   .filter(User.id.in_(user_ids), User.role == 'student')}
+    invalid_ids = sorted(user_ids - student_ids)
+    if invalid_ids:
+        return jsonify({
+            'error': 'Can only award points to students',
+            'invalid_user_ids': invalid_ids
+        }), 400
+    
+    totals = {}
+    for award in awards:
+        totals[award['user_id']] = totals.get(award['user_id'], 0) + award['amount']
+    
+    db.session.execute(insert(PointsTransaction), [{
+        'user_id': award['user_id'],
+        'transaction_type': 'earned',
+        'amount': award['amount'],
+        'reason': award['reason'],
+        'created_by': teacher_id
+    } for award in awards])
+    new_balances = credit_balances(totals)
     db.session.commit()
+    leaderboard.update_balances(new_balances)
     
     return jsonify({
         'message': 'Points awarded successfully',
-        'transaction': transaction.to_dict(),
-        'new_balance': student.points_balance
+        'awarded': len(awards),
+        'total_points': sum(totals.values()),
+        'new_balances': {str(user_id): balance for user_id, balance in new_balances.items()}
     }), 201
 
 @points_bp.route('/points/transactions/<int:user_id>', methods=['GET'])
 @login_required
 def get_user_transactions(user_id):
-    current_user = User.query.get(session['user_id'])
+    current_user = load_current_user()
+    if current_user is None:
+        return jsonify({'error': 'Authentication required'}), 401
     
     # Students can only view their own transactions
     if current_user.role == 'student' and current_user.id != user_id:
         return jsonify({'error': 'Access denied'}), 403
     
+    query = PointsTransaction.query.filter_by(user_id=user_id)
+    
+    # Cursor mode: ?cursor=...&limit=... skips the OFFSET scan and COUNT(*)
+    if wants_cursor(request.args):
+        try:
+            rows, next_cursor = keyset_page(
+                query, PointsTransaction,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', type=int))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'transactions': [t.to_dict() for t in rows],
+            'next_cursor': next_cursor
+        })
+    
     # Get pagination parameters
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    transactions = PointsTransaction.query.filter_by(user_id=user_id)\
-        .order_by(PointsTransaction.created_at.desc())\
+    transactions = query.order_by(PointsTransaction.created_at.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
@@ -120,28 +221,48 @@ def get_all_transactions():
     per_page = request.args.get('per_page', 50, type=int)
     user_id = request.args.get('user_id', type=int)
     
-    query = PointsTransaction.query
+    # Join in the student and awarding teacher rather than loading them per row
+    query = PointsTransaction.query.options(
+        joinedload(PointsTransaction.user),
+        joinedload(PointsTransaction.teacher)
+    )
     
     if user_id:
         query = query.filter_by(user_id=user_id)
     
-    transactions = query.order_by(PointsTransaction.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
-    
-    # Include user information in the response
-    result = []
-    for transaction in transactions.items:
+    def serialize(transaction):
         transaction_dict = transaction.to_dict()
-        user = User.query.get(transaction.user_id)
+        user = transaction.user
         if user:
             transaction_dict['user_name'] = f"{user.first_name} {user.last_name}"
         
         if transaction.created_by:
-            teacher = User.query.get(transaction.created_by)
+            teacher = transaction.teacher
             if teacher:
                 transaction_dict['teacher_name'] = f"{teacher.first_name} {teacher.last_name}"
         
-        result.append(transaction_dict)
+        return transaction_dict
+    
+    # Cursor mode: ?cursor=...&limit=... skips the OFFSET scan and COUNT(*)
+    if wants_cursor(request.args):
+        try:
+            rows, next_cursor = keyset_page(
+                query, PointsTransaction,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', type=int))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'transactions': [serialize(t) for t in rows],
+            'next_cursor': next_cursor
+        })
+    
+    transactions = query.order_by(PointsTransaction.created_at.desc())\
+        .paginate(page=page, per_page=per_page, error_out=False)
+    
+    # Include user information in the response
+    result = [serialize(t) for t in transactions.items]
     
     return jsonify({
         'transactions': result,
@@ -156,19 +277,75 @@ def get_points_leaderboard():
     # Get top students by points balance
     limit = request.args.get('limit', 10, type=int)
     
-    students = User.query.filter_by(role='student')\
-        .order_by(User.points_balance.desc())\
-        .limit(limit).all()
-    
-    leaderboard = []
-    for i, student in enumerate(students, 1):
-        leaderboard.append({
-            'rank': i,
-            'user_id': student.id,
-            'first_name': student.first_name,
-            'last_name': student.last_name,
-            'points_balance': student.points_balance
-        })
+    return jsonify({'leaderboard': leaderboard.top(limit)})
+
+@points_bp.route('/points/leaderboard/<int:user_id>', methods=['GET'])
+@login_required
+def get_leaderboard_rank(user_id):
+    current_user = load_current_user()
+    if current_user is None:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    # Students can only view their own rank
+    if current_user.role == 'student' and current_user.id != user_id:
+        return jsonify({'error': 'Access denied'}), 403
     
-    return jsonify({'leaderboard': leaderboard})
+    entry = leaderboard.rank_of(user_id)
+    if entry is None:
+        return jsonify({'error': 'Student not found'}), 404
+    return jsonify(entry)
+
+# Ledger reconciliation: points_balance against SUM(earned) - SUM(spent)
+MAX_DRIFT_PAGE = 500
+
+@job_handler('reconcile')
+def run_reconciliation(payload, context):
+    def progress(done, total):
+        context.progress(done, total, f'Checked users up to id {done} of {total}')
+    run = reconcile(payload['run_id'], progress)
+    if run.repair == 'balance' and run.repaired:
+        leaderboard.invalidate()
+    return run.to_dict()
+
+@points_bp.route('/points/reconcile', methods=['POST'])
+@teacher_required
+def start_reconciliation():
+    data = request.get_json(silent=True) or {}
+    try:
+        run = start_run(data.get('repair'), current_user_id())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    job_id = submit_job('reconcile', {'run_id': run.id}, current_user_id())
+    return job_accepted(job_id, run_id=run.id, report_url=f'/api/points/reconcile/{run.id}')
+
+@points_bp.route('/points/reconcile/<int:run_id>', methods=['GET'])
+@teacher_required
+def get_reconciliation(run_id):
+    """A run's counters plus its drifted accounts, paged by user id with ?after="""
+    run = db.session.get(ReconciliationRun, run_id)
+    if run is None:
+        return jsonify({'error': 'Reconciliation run not found'}), 404
+
+    after = request.args.get('after', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 100, type=int), MAX_DRIFT_PAGE))
+    drifts = LedgerDrift.query.filter(LedgerDrift.run_id == run_id, LedgerDrift.user_id > after)\
+        .order_by(LedgerDrift.user_id).limit(limit).all()
+
+    result = run.to_dict()
+    result['drifts'] = [drift.to_dict() for drift in drifts]
+    result['next_after'] = drifts[-1].user_id if len(drifts) == limit else None
+    return jsonify(result)
+
+@points_bp.route('/points/reconcile/<int:run_id>/resume', methods=['POST'])
+@teacher_required
+def resume_reconciliation(run_id):
+    """Continue an interrupted run from its checkpoint"""
+    run = db.session.get(ReconciliationRun, run_id)
+    if run is None:
+        return jsonify({'error': 'Reconciliation run not found'}), 404
+    if run.status == 'completed':
+        return jsonify({'error': 'Reconciliation run already completed'}), 409
 
+    job_id = submit_job('reconcile', {'run_id': run.id}, current_user_id())
+    return job_accepted(job_id, run_id=run.id, report_url=f'/api/points/reconcile/{run.id}')
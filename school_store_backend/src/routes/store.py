@@ -1,72 +1,58 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, request, current_app
 from src.models.user import User, db
 from src.models.store_item import StoreItem
 from src.models.purchase import Purchase
 from src.models.points_transaction import PointsTransaction
-from functools import wraps
-import os
-from werkzeug.utils import secure_filename
-
+from src.services.catalog_cache import catalog_cache
+from src.services.points_ledger import debit_balance
+from src.services.leaderboard import leaderboard
+from src.services.image_store import (UploadTooLarge, generate_variants, original_url,
+                                      save_original, variant_cache, variant_urls)
+from src.services.jobs import job_handler, submit_job
+from src.services.chunked_upload import UploadError, chunked_uploads
+from src.utils.pagination import keyset_page, wants_cursor
+from src.utils.auth import current_user_id, load_current_user, login_required, teacher_required
+import logging
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+logger = logging.getLogger(__name__)
 store_bp = Blueprint('store', __name__)
 
-# Authentication decorators
-
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-
-def teacher_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        user = User.query.get(session['user_id'])
-        if not user or user.role != 'teacher':
-            return jsonify({'error': 'Teacher access required'}), 403
-        return f(*args, **kwargs)
-    return decorated_function
-
 # Store Item Management Routes
 
 
 @store_bp.route('/store/items', methods=['GET'])
 @login_required
 def get_store_items():
-    print(f"DEBUG: /store/items called by user_id: {session.get('user_id')}")
-
     # Get query parameters
     category = request.args.get('category')
     available_only = request.args.get(
         'available_only', 'true').lower() == 'true'
 
-    query = StoreItem.query
+    def build_catalog():
+        query = StoreItem.query
 
-    if category:
-        query = query.filter_by(category=category)
+        if category:
+            query = query.filter_by(category=category)
 
-    if available_only:
-        query = query.filter_by(is_available=True)
+        if available_only:
+            query = query.filter_by(is_available=True)
 
-    items = query.order_by(StoreItem.name).all()
-    items_list = [item.to_dict() for item in items]
+        items = query.order_by(StoreItem.name).all()
+        logger.debug("Catalog cache miss, serialized %d items", len(items))
 
-    print(f"DEBUG: Returning {len(items_list)} items")
-    print(
-        f"DEBUG: First item (if any): {items_list[0] if items_list else 'No items'}")
+        # The frontend expects the item array directly
+        return jsonify([item.to_dict() for item in items]).get_data()
 
-    # The frontend expects {success: true, items: [...]} but backend returns just [...]
-    # This is the issue - let's confirm with logging first
-    response_data = items_list  # Currently returning array directly
-    print(
-        f"DEBUG: Response structure - is list: {isinstance(response_data, list)}")
+    body, etag = catalog_cache.get_or_build(
+        (category, available_only), build_catalog)
 
-    return jsonify(response_data)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers must revalidate, but an unchanged catalog costs only a 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 
 @store_bp.route('/store/items/<int:item_id>', methods=['GET'])
@@ -137,6 +123,7 @@ def create_store_item():
 
     db.session.add(item)
     db.session.commit()
+    catalog_cache.bump_version()
 
     return jsonify(item.to_dict()), 201
 
@@ -185,6 +172,7 @@ def update_store_item(item_id):
         item.set_available_sizes(available_sizes)
 
     db.session.commit()
+    catalog_cache.bump_version()
     return jsonify(item.to_dict())
 
 
@@ -194,6 +182,7 @@ def delete_store_item(item_id):
     item = StoreItem.query.get_or_404(item_id)
     db.session.delete(item)
     db.session.commit()
+    catalog_cache.bump_version()
     return '', 204
 
 
@@ -214,7 +203,7 @@ def get_categories():
 @login_required
 def purchase_item():
     data = request.json
-    user_id = session['user_id']
+    user_id = current_user_id()
 
     # Validate required fields
     required_fields = ['item_id', 'quantity', 'size']
@@ -229,9 +218,8 @@ def purchase_item():
     if quantity <= 0:
         return jsonify({'error': 'Quantity must be positive'}), 400
 
-    # Get the item and user
+    # Get the item
     item = StoreItem.query.get_or_404(item_id)
-    user = User.query.get_or_404(user_id)
 
     # Check if item is available
     if not item.is_available:
@@ -249,8 +237,12 @@ def purchase_item():
     # Calculate total cost
     total_cost = item_price * quantity
 
-    # Check if user has enough points
-    if user.points_balance < total_cost:
+    # Check and debit the balance in one conditional UPDATE so concurrent
+    # purchases cannot both pass the check
+    new_balance = debit_balance(user_id, total_cost)
+    if new_balance is None:
+        db.session.rollback()
+        user = User.query.get_or_404(user_id)
         return jsonify({
             'error': 'Insufficient points',
             'required': total_cost,
@@ -266,45 +258,152 @@ def purchase_item():
         total_cost=total_cost,
         status='completed'
     )
+    db.session.add(purchase)
+    db.session.flush()
 
-    # Create points transaction record
+    # Create points transaction record already linked to the purchase
     transaction = PointsTransaction(
         user_id=user_id,
         transaction_type='spent',
         amount=total_cost,
         reason=f"Purchased {quantity}x {item.name} ({size})",
-        reference_id=None  # Will be set to purchase.id after commit
+        reference_id=purchase.id
     )
-
-    # Update user's points balance
-    user.points_balance -= total_cost
-
-    db.session.add(purchase)
     db.session.add(transaction)
-    db.session.commit()
 
-    # Update transaction with purchase reference
-    transaction.reference_id = purchase.id
+    # Serialize before commit expires the loaded rows
+    purchase_dict = purchase.to_dict_with_item()
     db.session.commit()
+    leaderboard.update_balance(user_id, new_balance)
 
     return jsonify({
         'message': 'Purchase successful',
-        'purchase': purchase.to_dict_with_item(),
-        'new_balance': user.points_balance
+        'purchase': purchase_dict,
+        'new_balance': new_balance
+    }), 201
+
+
+@store_bp.route('/store/checkout', methods=['POST'])
+@login_required
+def checkout():
+    """Buy every line of a cart in one transaction.
+
+    Expects {"items": [{"item_id", "size", "quantity"}, ...]}. The balance is
+    debited once for the cart total; if it is too low nothing is written.
+    """
+    data = request.json or {}
+    user_id = current_user_id()
+
+    cart = data.get('items')
+    if not isinstance(cart, list) or not cart:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+
+    # Validate required fields on every line
+    required_fields = ['item_id', 'quantity', 'size']
+    for index, line in enumerate(cart):
+        if not isinstance(line, dict):
+            return jsonify({'error': f'Cart line {index} must be an object'}), 400
+        for field in required_fields:
+            if field not in line:
+                return jsonify({'error': f'{field} is required', 'line': index}), 400
+        # Lists or objects here would fail when lines are grouped below
+        if not isinstance(line['item_id'], int) or isinstance(line['item_id'], bool):
+            return jsonify({'error': 'item_id must be an integer', 'line': index}), 400
+        if not isinstance(line['size'], str):
+            return jsonify({'error': 'size must be a string', 'line': index}), 400
+        if not isinstance(line['quantity'], int) or isinstance(line['quantity'], bool) \
+                or line['quantity'] <= 0:
+            return jsonify({'error': 'Quantity must be positive', 'line': index}), 400
+
+    # Load every referenced item with one query
+    item_ids = {line['item_id'] for line in cart}
+    items = {item.id: item for item in
+             StoreItem.query.filter(StoreItem.id.in_(item_ids)).all()}
+
+    # Price each line
+    priced_lines = []
+    for index, line in enumerate(cart):
+        item = items.get(line['item_id'])
+        if item is None:
+            return jsonify({'error': 'Item not found', 'line': index}), 404
+        if not item.is_available:
+            return jsonify({'error': f'{item.name} is not available', 'line': index}), 400
+
+        item_price = item.get_price_for_size(line['size'])
+        if item_price is None:
+            return jsonify({
+                'error': f'Size "{line["size"]}" is not available for {item.name}',
+                'available_sizes': item.get_available_sizes(),
+                'line': index
+            }), 400
+
+        priced_lines.append((item, line['size'], line['quantity'],
+                             item_price * line['quantity']))
+
+    total_cost = sum(line_cost for _, _, _, line_cost in priced_lines)
+
+    # Debit the cart total once; nothing is written if it is not covered
+    new_balance = debit_balance(user_id, total_cost)
+    if new_balance is None:
+        db.session.rollback()
+        user = User.query.get_or_404(user_id)
+        return jsonify({
+            'error': 'Insufficient points',
+            'required': total_cost,
+            'available': user.points_balance
+        }), 400
+
+    # Bulk-insert the purchases, getting them back in cart order for their ids
+    purchases = db.session.scalars(
+        insert(Purchase).returning(Purchase, sort_by_parameter_order=True),
+        [{
+            'user_id': user_id,
+            'item_id': item.id,
+            'quantity': quantity,
+            'size': size,
+            'total_cost': line_cost,
+            'status': 'completed'
+        } for item, size, quantity, line_cost in priced_lines]
+    ).all()
+
+    db.session.execute(insert(PointsTransaction), [{
+        'user_id': user_id,
+        'transaction_type': 'spent',
+        'amount': line_cost,
+        'reason': f"Purchased {quantity}x {item.name} ({size})",
+        'reference_id': purchase.id
+    } for purchase, (item, size, quantity, line_cost) in zip(purchases, priced_lines)])
+
+    # Serialize before commit expires the loaded rows
+    purchase_dicts = [purchase.to_dict_with_item() for purchase in purchases]
+    db.session.commit()
+    leaderboard.update_balance(user_id, new_balance)
+
+    return jsonify({
+        'message': 'Checkout successful',
+        'purchases': purchase_dicts,
+        'total_cost': total_cost,
+        'new_balance': new_balance
     }), 201
 
 
 @store_bp.route('/store/purchases', methods=['GET'])
 @login_required
 def get_purchases():
-    current_user = User.query.get(session['user_id'])
+    current_user = load_current_user()
+    if current_user is None:
+        return jsonify({'error': 'Authentication required'}), 401
 
     # Get query parameters
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     user_id = request.args.get('user_id', type=int)
 
-    query = Purchase.query
+    # Load each purchase's item (and buyer, for teachers) in the page query
+    # itself so the page costs the same number of queries at any per_page
+    query = Purchase.query.options(joinedload(Purchase.item))
+    if current_user.role == 'teacher':
+        query = query.options(joinedload(Purchase.user))
 
     # Students can only view their own purchases
     if current_user.role == 'student':
@@ -312,21 +411,37 @@ def get_purchases():
     elif user_id:  # Teachers can filter by user_id
         query = query.filter_by(user_id=user_id)
 
-    purchases = query.order_by(Purchase.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
-
-    # Include item and user information
-    result = []
-    for purchase in purchases.items:
+    def serialize(purchase):
         purchase_dict = purchase.to_dict_with_item()
 
         # Add user information for teachers
         if current_user.role == 'teacher':
-            user = User.query.get(purchase.user_id)
+            user = purchase.user
             if user:
                 purchase_dict['user_name'] = f"{user.first_name} {user.last_name}"
 
-        result.append(purchase_dict)
+        return purchase_dict
+
+    # Cursor mode: ?cursor=...&limit=... skips the OFFSET scan and COUNT(*)
+    if wants_cursor(request.args):
+        try:
+            rows, next_cursor = keyset_page(
+                query, Purchase,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', type=int))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'purchases': [serialize(purchase) for purchase in rows],
+            'next_cursor': next_cursor
+        })
+
+    purchases = query.order_by(Purchase.created_at.desc())\
+        .paginate(page=page, per_page=per_page, error_out=False)
+
+    # Include item and user information
+    result = [serialize(purchase) for purchase in purchases.items]
 
     return jsonify({
         'purchases': result,
@@ -339,7 +454,9 @@ def get_purchases():
 @store_bp.route('/store/purchases/<int:purchase_id>', methods=['GET'])
 @login_required
 def get_purchase(purchase_id):
-    current_user = User.query.get(session['user_id'])
+    current_user = load_current_user()
+    if current_user is None:
+        return jsonify({'error': 'Authentication required'}), 401
     purchase = Purchase.query.get_or_404(purchase_id)
 
     # Students can only view their own purchases
@@ -367,20 +484,98 @@ def upload_image():
        file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
         return jsonify({'error': 'Invalid file type'}), 400
 
-    # Create uploads directory if it doesn't exist
-    upload_dir = os.path.join(os.path.dirname(
-        __file__), '..', 'static', 'uploads')
-    os.makedirs(upload_dir, exist_ok=True)
+    # Store under the content hash (duplicates are kept once)
+    try:
+        digest, extension = save_original(file.stream)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Save file with secure filename
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(upload_dir, filename)
-    file.save(file_path)
+    response = {'message': 'File uploaded successfully'}
+    response.update(queue_image_variants(digest, extension))
+    return jsonify(response), 201
 
-    # Return the URL path for the uploaded file
-    image_url = f'/uploads/{filename}'
 
-    return jsonify({
-        'message': 'File uploaded successfully',
-        'image_url': image_url
-    }), 201
+@job_handler('image_variants')
+def run_image_variants(payload, context):
+    written = generate_variants(payload['digest'], payload['extension'])
+    image_url = original_url(payload['digest'], payload['extension'])
+    variant_cache.forget(image_url)
+    return {'image_variants': variant_urls(image_url), 'generated': written}
+
+
+def queue_image_variants(digest, extension):
+    """Resize a stored original in the background.
+
+    Until the job finishes, image_variants points every size at the
+    original, the same fallback items get when Pillow is missing.
+    """
+    job_id = submit_job('image_variants', {'digest': digest, 'extension': extension},
+                        current_user_id())
+    image_url = original_url(digest, extension)
+    return {'image_url': image_url, 'image_variants': variant_urls(image_url),
+            'variants_job_id': job_id}
+
+
+# Resumable chunked uploads: POST to start, PATCH each chunk with an
+# Upload-Offset header, GET to find where to resume, DELETE to abandon
+
+
+def upload_error_response(error):
+    body = {'error': str(error)}
+    if error.offset is not None:
+        body['offset'] = error.offset
+    return jsonify(body), error.status
+
+
+@store_bp.route('/upload/sessions', methods=['POST'])
+@teacher_required
+def create_upload_session():
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = chunked_uploads.create(current_user_id(), data.get('size'), data.get('filename'))
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify(upload), 201
+
+
+@store_bp.route('/upload/sessions/<upload_id>', methods=['GET'])
+@teacher_required
+def get_upload_session(upload_id):
+    try:
+        return jsonify(chunked_uploads.status(upload_id, current_user_id()))
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@store_bp.route('/upload/sessions/<upload_id>', methods=['PATCH'])
+@teacher_required
+def upload_chunk(upload_id):
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+
+    try:
+        upload = chunked_uploads.append(upload_id, current_user_id(), offset,
+                                        request.stream, request.content_length)
+    except UploadError as e:
+        return upload_error_response(e)
+
+    if not upload['complete']:
+        return jsonify(upload)
+
+    upload.update(queue_image_variants(upload.pop('digest'), upload.pop('extension')),
+                  message='File uploaded successfully')
+    return jsonify(upload), 201
+
+
+@store_bp.route('/upload/sessions/<upload_id>', methods=['DELETE'])
+@teacher_required
+def cancel_upload_session(upload_id):
+    try:
+        chunked_uploads.cancel(upload_id, current_user_id())
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({'message': 'Upload cancelled'})
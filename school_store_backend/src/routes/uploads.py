@@ -0,0 +1,58 @@
+from flask import Blueprint, abort, send_from_directory
+from src.services import image_store
+import hashlib
+import os
+import threading
+
+uploads_bp = Blueprint('uploads', __name__)
+
+# Content-addressed names never change meaning, so browsers may keep them
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# ETags of files uploaded before content addressing, keyed by (name, mtime, size)
+_legacy_etags = {}
+_legacy_lock = threading.Lock()
+
+
+def _content_etag(filename, path):
+    """Strong ETag: the hash in a content-addressed name, else a hash of the file"""
+    stem = filename.rsplit('.', 1)[0]
+    digest = stem.split('-', 1)[0]
+    if len(digest) == 64 and all(c in '0123456789abcdef' for c in digest):
+        return stem, True
+
+    stat = os.stat(path)
+    key = (filename, stat.st_mtime_ns, stat.st_size)
+    with _legacy_lock:
+        etag = _legacy_etags.get(key)
+    if etag is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(image_store.CHUNK_SIZE), b''):
+                sha.update(chunk)
+        etag = sha.hexdigest()[:32]
+        with _legacy_lock:
+            _legacy_etags[key] = etag
+    return etag, False
+
+
+@uploads_bp.route('/uploads/<path:filename>', methods=['GET', 'HEAD'])
+def serve_upload(filename):
+    # Dot entries (in-progress chunked uploads, temp files) are never served
+    if any(part.startswith('.') for part in filename.split('/')):
+        abort(404)
+    path = os.path.join(image_store.UPLOAD_DIR, filename)
+    if not os.path.isfile(path):
+        abort(404)
+
+    etag, immutable = _content_etag(filename, path)
+    # conditional=True answers If-None-Match/If-Modified-Since with 304 and
+    # Range with 206; the body goes out through the server's file wrapper
+    # (sendfile under gunicorn) rather than being read into Python
+    response = send_from_directory(image_store.UPLOAD_DIR, filename, etag=etag,
+                                   conditional=True, max_age=None)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+    # Werkzeug only sets this on 206 responses; advertise it on full ones too
+    response.headers.setdefault('Accept-Ranges', 'bytes')
+    return response
@@ -3,13 +3,24 @@ from src.models.user import User, db
 from src.models.points_transaction import PointsTransaction
 from src.models.store_item import StoreItem
 from src.models.purchase import Purchase
+from src.routes.jobs import job_accepted
+from src.services.jobs import job_handler, submit_job
+from src.services.leaderboard import leaderboard
+from src.utils.auth import (current_user_id, issue_claims, load_current_user, login_required,
+                            teacher_required, user_version, user_versions)
 from functools import wraps
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
+import csv
+import io
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 user_bp = Blueprint('user', __name__)
 
+# Rosters longer than this are imported by a background job
+ROSTER_JOB_THRESHOLD = int(os.environ.get('ROSTER_JOB_THRESHOLD', '200'))
+
 # Database error handler decorator
 
 
@@ -30,74 +41,43 @@ def handle_db_errors(f):
             return jsonify({'error': 'An unexpected error occurred.'}), 500
     return decorated_function
 
-# Authentication decorator
-
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-
-def teacher_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        try:
-            user = User.query.get(session['user_id'])
-            if not user or user.role != 'teacher':
-                return jsonify({'error': 'Teacher access required'}), 403
-        except (OperationalError, SQLAlchemyError) as e:
-            logger.error(f"Database error in teacher_required: {e}")
-            return jsonify({'error': 'Database connection error'}), 503
-        return f(*args, **kwargs)
-    return decorated_function
-
 # Authentication Routes
 
 
 @user_bp.route('/auth/login', methods=['POST'])
 @handle_db_errors
 def login():
-    print(
-        f"[DEBUG] Login endpoint called with method: {request.method}", flush=True)
-    print(f"[DEBUG] Request path: {request.path}", flush=True)
-    print(
-        f"[DEBUG] Request headers: Content-Type={request.headers.get('Content-Type')}", flush=True)
+    logger.debug("Login called, Content-Type=%s",
+                 request.headers.get('Content-Type'))
 
     data = request.json
-    print(f"[DEBUG] Login data received: {data}", flush=True)
 
     username = data.get('username')
     password = data.get('password')
 
     if not username or not password:
-        print("[DEBUG] Missing username or password", flush=True)
+        logger.debug("Login missing username or password")
         return jsonify({'error': 'Username and password required'}), 400
 
     user = User.query.filter_by(username=username).first()
     if user and user.check_password(password):
-        session['user_id'] = user.id
-        session['user_role'] = user.role
+        token = issue_claims(user)
         response_data = {
             'message': 'Login successful',
-            'user': user.to_dict_safe() if user.role == 'student' else user.to_dict()
+            'user': user.to_dict_safe() if user.role == 'student' else user.to_dict(),
+            'token': token
         }
-        print(
-            f"[DEBUG] Login successful, returning: {response_data}", flush=True)
+        logger.debug("Login successful for %s (role %s)", user.username, user.role)
         return jsonify(response_data)
 
-    print("[DEBUG] Invalid credentials", flush=True)
+    logger.debug("Invalid credentials for %s", username)
     return jsonify({'error': 'Invalid credentials'}), 401
 
 
 @user_bp.route('/auth/logout', methods=['POST'])
 @login_required
 def logout():
+    """End the cookie session; bearer tokens stay valid until TOKEN_MAX_AGE"""
     session.clear()
     return jsonify({'message': 'Logout successful'})
 
@@ -106,17 +86,12 @@ def logout():
 @login_required
 @handle_db_errors
 def get_current_user():
-    print(f"[DEBUG] /auth/me endpoint called", flush=True)
-    print(
-        f"[DEBUG] Session data: user_id={session.get('user_id')}, user_role={session.get('user_role')}", flush=True)
-
-    user = User.query.get(session['user_id'])
+    user = load_current_user()
     if not user:
-        print("[DEBUG] User not found in database", flush=True)
+        logger.debug("Session user not found in database")
         return jsonify({'error': 'User not found'}), 404
 
-    print(
-        f"[DEBUG] User found: {user.username}, role: {user.role}", flush=True)
+    logger.debug("Current user %s, role %s", user.username, user.role)
     return jsonify(user.to_dict_safe() if user.role == 'student' else user.to_dict())
 
 # User Management Routes
@@ -143,6 +118,10 @@ def create_user():
         if field not in data:
             return jsonify({'error': f'{field} is required'}), 400
 
+    points_balance = data.get('points_balance', 0)
+    if not isinstance(points_balance, int) or isinstance(points_balance, bool):
+        return jsonify({'error': 'points_balance must be an integer'}), 400
+
     # Check if username already exists
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'error': 'Username already exists'}), 400
@@ -162,13 +141,24 @@ def create_user():
         last_name=data['last_name'],
         role=data['role'],
         email=email,
-        points_balance=data.get('points_balance', 0)
+        points_balance=points_balance
     )
     user.set_password(data['password'])
 
     try:
         db.session.add(user)
+        if points_balance:
+            # Opening balance goes in the ledger too, so the account reconciles
+            db.session.flush()
+            db.session.add(PointsTransaction(
+                user_id=user.id,
+                transaction_type='earned' if points_balance > 0 else 'spent',
+                amount=abs(points_balance),
+                reason='Initial points allocation',
+                created_by=current_user_id()
+            ))
         db.session.commit()
+        leaderboard.invalidate()
         return jsonify(user.to_dict()), 201
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -176,11 +166,63 @@ def create_user():
         return jsonify({'error': 'Failed to create user'}), 500
 
 
+def read_roster(req):
+    """Pull roster rows from an uploaded CSV file, a CSV body or JSON {"users": [...]}"""
+    if 'file' in req.files:
+        text = req.files['file'].read().decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(text)))
+    if req.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(req.get_data(as_text=True))))
+    data = req.get_json(silent=True) or {}
+    return data.get('users')
+
+
+@job_handler('roster_import')
+def run_roster_import(payload, context=None):
+    # Imported here: the process pool machinery is only needed for imports
+    from src.services.roster_import import import_roster
+    def progress(done, total):
+        if context is not None:
+            context.progress(done, total, f'{done} of {total} rows imported')
+    result = import_roster(payload['users'], progress, payload.get('created_by'))
+    if result['created']:
+        leaderboard.invalidate()
+    return result
+
+
+@user_bp.route('/users/import', methods=['POST'])
+@teacher_required
+@handle_db_errors
+def import_users():
+    try:
+        records = read_roster(request)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Roster file must be UTF-8 CSV'}), 400
+
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'Roster must contain at least one row'}), 400
+
+    # Hashing a large roster's passwords takes a while; answer with a job id
+    if len(records) > ROSTER_JOB_THRESHOLD or request.args.get('async') in ('1', 'true'):
+        return job_accepted(submit_job('roster_import', {'users': records, 'created_by': current_user_id()},
+                                       current_user_id()))
+
+    result = run_roster_import({'users': records, 'created_by': current_user_id()})
+    status = 201 if result['created'] else 400
+    return jsonify({
+        'message': f"Imported {result['created']} of {len(records)} users",
+        'created': result['created'],
+        'errors': result['errors']
+    }), status
+
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 @login_required
 @handle_db_errors
 def get_user(user_id):
-    current_user = User.query.get(session['user_id'])
+    current_user = load_current_user()
+    if current_user is None:
+        return jsonify({'error': 'Authentication required'}), 401
 
     # Students can only view their own profile
     if current_user.role == 'student' and current_user.id != user_id:
@@ -208,7 +250,15 @@ def update_user(user_id):
 
     try:
         db.session.commit()
-        return jsonify(user.to_dict())
+        # Old claims stop working if the role or password changed
+        user_versions.set(user.id, user_version(user))
+        leaderboard.invalidate()
+        result = user.to_dict()
+        if user.id == current_user_id():
+            # Editing yourself: replace your own session and token so the
+            # next request isn't rejected by the version bump
+            result['token'] = issue_claims(user)
+        return jsonify(result)
     except SQLAlchemyError as e:
         db.session.rollback()
         logger.error(f"Failed to update user: {e}")
@@ -223,6 +273,8 @@ def delete_user(user_id):
     try:
         db.session.delete(user)
         db.session.commit()
+        user_versions.revoke(user_id)
+        leaderboard.invalidate()
         return '', 204
     except SQLAlchemyError as e:
         db.session.rollback()
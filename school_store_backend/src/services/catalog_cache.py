@@ -0,0 +1,80 @@
+import hashlib
+import os
+import threading
+import time
+
+
+class CatalogCache:
+    """In-process cache of serialized store catalog responses.
+
+    Entries are keyed by (category, available_only) and hold the JSON body
+    bytes and a strong ETag. The ETag is a hash of the body alone, so every
+    worker process gives the same catalog the same ETag. Every entry is
+    stamped with the catalog version it was built from; the teacher write
+    routes bump the version, which invalidates all entries at once.
+
+    The version is per process: after an edit, other gunicorn workers keep
+    serving their cached catalog for up to ttl seconds (CATALOG_CACHE_TTL,
+    default 30). That is the staleness students can see, and the reason the
+    TTL is short. Category comes from the query string, so at most
+    max_entries catalogs are kept; the oldest is dropped to make room.
+    """
+
+    def __init__(self, ttl=30, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump_version(self):
+        """Invalidate every cached catalog after an item is created, changed or removed"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        version, expires_at, body, etag = entry
+        if version != self._version or expires_at < time.monotonic():
+            return None
+        return body, etag
+
+    def get_or_build(self, key, build):
+        """Return (body, etag) for key, calling build() to produce the body on a miss.
+
+        Only one thread builds a given catalog; the others wait for it instead
+        of all hitting the database when a whole class logs in at once.
+        """
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+
+            version = self._version
+            body = build()
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                # Dicts keep insertion order, so the first key is the oldest
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (version, time.monotonic() + self.ttl, body, etag)
+            return body, etag
+
+
+catalog_cache = CatalogCache(ttl=int(os.environ.get('CATALOG_CACHE_TTL', '30')),
+                             max_entries=int(os.environ.get('CATALOG_CACHE_ENTRIES', '64')))
@@ -0,0 +1,190 @@
+import json
+import os
+import re
+import secrets
+import time
+from src.services import image_store
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+# Largest body accepted for one chunk, in bytes
+MAX_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(5 * 1024 * 1024)))
+
+# Unfinished uploads are discarded after this many seconds
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', str(24 * 3600)))
+
+UPLOAD_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{22}$')
+
+
+class UploadError(Exception):
+    """An upload request that cannot be applied; carries the HTTP status to return"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploads:
+    """Resumable image uploads, received in chunks and kept on disk.
+
+    Each upload is a .part file plus a small JSON metadata file in
+    static/uploads/.partial, so any worker process can take the next chunk
+    and the server holds at most one read buffer of it in memory. The
+    current offset is the size of the .part file; a client that loses its
+    connection asks for the offset and continues from there. Chunks for
+    one upload are serialised with an advisory file lock. When the last
+    byte arrives the file is hashed and renamed into static/uploads under
+    its content hash, the same as a single-request upload.
+    """
+
+    def __init__(self, max_size=None, chunk_size=MAX_CHUNK_SIZE, ttl=UPLOAD_SESSION_TTL):
+        self.max_size = max_size or image_store.MAX_IMAGE_SIZE
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+
+    @property
+    def directory(self):
+        return os.path.join(image_store.UPLOAD_DIR, '.partial')
+
+    def _paths(self, upload_id):
+        base = os.path.join(self.directory, upload_id)
+        return base + '.part', base + '.json'
+
+    def _load(self, upload_id, user_id):
+        """Return the metadata of a live upload owned by user_id"""
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise UploadError('Upload not found', 404)
+        part_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise UploadError('Upload not found', 404)
+        # Other users' uploads look the same as missing ones
+        if meta['user_id'] != user_id:
+            raise UploadError('Upload not found', 404)
+        if meta['created_at'] + self.ttl < time.time():
+            self._discard(upload_id)
+            raise UploadError('Upload expired', 404)
+        return meta
+
+    def _save_meta(self, upload_id, meta):
+        _, meta_path = self._paths(upload_id)
+        temp_path = meta_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+
+    def _discard(self, upload_id):
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def cleanup_expired(self):
+        """Delete uploads older than the TTL; returns how many were removed"""
+        removed = 0
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            if name.endswith('.json') and os.path.getmtime(os.path.join(self.directory, name)) < cutoff:
+                self._discard(name[:-len('.json')])
+                removed += 1
+        return removed
+
+    def create(self, user_id, size, filename=None):
+        """Start an upload of `size` bytes; returns its status"""
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise UploadError('size must be a positive integer')
+        if size > self.max_size:
+            raise UploadError(f'File exceeds the {self.max_size / (1024 * 1024):g} MB limit', 413)
+
+        self.cleanup_expired()
+        os.makedirs(self.directory, exist_ok=True)
+        upload_id = secrets.token_urlsafe(16)
+        part_path, _ = self._paths(upload_id)
+        open(part_path, 'xb').close()
+        meta = {'user_id': user_id, 'size': size, 'filename': filename,
+                'type': None, 'created_at': time.time()}
+        self._save_meta(upload_id, meta)
+        return self._status(upload_id, meta, 0)
+
+    def _status(self, upload_id, meta, offset):
+        return {'upload_id': upload_id, 'offset': offset, 'size': meta['size'],
+                'chunk_size': self.chunk_size, 'complete': False}
+
+    def status(self, upload_id, user_id):
+        meta = self._load(upload_id, user_id)
+        part_path, _ = self._paths(upload_id)
+        return self._status(upload_id, meta, os.path.getsize(part_path))
+
+    def append(self, upload_id, user_id, offset, stream, length):
+        """Append one chunk at `offset`; returns the new status.
+
+        When the chunk completes the upload, the returned status has
+        complete=True plus the stored image's digest and extension.
+        """
+        meta = self._load(upload_id, user_id)
+        if length is None:
+            raise UploadError('Content-Length is required', 411)
+        if length > self.chunk_size:
+            raise UploadError(f'Chunks may be at most {self.chunk_size} bytes', 413)
+
+        part_path, _ = self._paths(upload_id)
+        with open(part_path, 'ab') as out:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadError('Another chunk of this upload is in progress', 409)
+
+            current = os.fstat(out.fileno()).st_size
+            if offset != current:
+                raise UploadError('Offset does not match the bytes received', 409, current)
+            if current + length > meta['size']:
+                raise UploadError('Chunk runs past the declared upload size', 413, current)
+
+            remaining = length
+            while remaining:
+                chunk = stream.read(min(image_store.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break  # Client went away; the bytes so far are kept for resuming
+                out.write(chunk)
+                remaining -= len(chunk)
+            out.flush()
+            received = current + length - remaining
+
+            # Sniff the type as soon as enough bytes are in, not after the whole file
+            if meta['type'] is None and received >= image_store.SNIFF_BYTES:
+                with open(part_path, 'rb') as f:
+                    meta['type'] = image_store.sniff_image_type(f.read(image_store.SNIFF_BYTES))
+                if meta['type'] is None:
+                    self._discard(upload_id)
+                    raise UploadError('File is not a PNG, JPEG, GIF or WebP image', 415)
+                self._save_meta(upload_id, meta)
+
+            status = self._status(upload_id, meta, received)
+            if received == meta['size']:
+                try:
+                    digest, extension = image_store.adopt_original(part_path)
+                except ValueError as e:
+                    self._discard(upload_id)
+                    raise UploadError(str(e), 415)
+                self._discard(upload_id)
+                status.update(complete=True, digest=digest, extension=extension)
+            return status
+
+    def cancel(self, upload_id, user_id):
+        self._load(upload_id, user_id)
+        self._discard(upload_id)
+
+
+chunked_uploads = ChunkedUploads()
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads')
+UPLOAD_URL_PREFIX = '/uploads/'
+
+# Resized variants by name: longest edge in pixels, largest first
+VARIANTS = (('full', 1600), ('card', 480), ('thumb', 160))
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+
+# Bytes read from the upload stream at a time
+CHUNK_SIZE = 64 * 1024
+
+# Largest accepted image, in bytes
+MAX_IMAGE_SIZE = int(os.environ.get('MAX_IMAGE_SIZE', str(10 * 1024 * 1024)))
+
+# Bytes needed to recognise every supported format
+SNIFF_BYTES = 12
+
+# Originals are stored as /uploads/<sha256>.<ext>; variants as <sha256>-<name>.webp
+CONTENT_ADDRESSED_URL = re.compile(r'^/uploads/([0-9a-f]{64})\.(png|jpg|gif|webp)$')
+
+# How long a partial variant set is trusted before the disk is checked again
+VARIANT_RECHECK_SECONDS = int(os.environ.get('VARIANT_RECHECK_SECONDS', '60'))
+
+# Distinct image URLs whose variant sets are kept
+VARIANT_CACHE_ENTRIES = int(os.environ.get('VARIANT_CACHE_ENTRIES', '4096'))
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds its size cap"""
+
+    def __init__(self, max_size):
+        super().__init__(f'File exceeds the {max_size / (1024 * 1024):g} MB limit')
+        self.max_size = max_size
+
+
+def sniff_image_type(header):
+    """Return the file extension for PNG, JPEG, GIF or WebP magic bytes, else None"""
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def require_image_type(header):
+    extension = sniff_image_type(header)
+    if extension is None:
+        raise ValueError('File is not a PNG, JPEG, GIF or WebP image')
+    return extension
+
+
+def _commit_original(temp_path, digest, extension):
+    """Move a finished temp file to its content-addressed name (dropping duplicates)"""
+    final_path = os.path.join(UPLOAD_DIR, f'{digest}.{extension}')
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, final_path)
+
+
+def save_original(stream, max_size=None):
+    """Stream an upload to disk under its content hash; returns (digest, extension).
+
+    Identical files map to the same name, so a duplicate upload is dropped
+    instead of written twice. The type is sniffed from the first bytes and
+    the size checked as data arrives, so a bad upload is abandoned early.
+    Raises ValueError if it is not a supported image, or UploadTooLarge.
+    """
+    max_size = max_size or MAX_IMAGE_SIZE
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    header = b''
+    extension = None
+    written = 0
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                written += len(chunk)
+                if written > max_size:
+                    raise UploadTooLarge(max_size)
+                if extension is None and len(header) < SNIFF_BYTES:
+                    header += chunk[:SNIFF_BYTES - len(header)]
+                    if len(header) == SNIFF_BYTES:
+                        extension = require_image_type(header)
+                digest.update(chunk)
+                out.write(chunk)
+
+        extension = extension or require_image_type(header)
+        _commit_original(temp_path, digest.hexdigest(), extension)
+        return digest.hexdigest(), extension
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def adopt_original(temp_path):
+    """Hash a fully received temp file in UPLOAD_DIR and store it like save_original"""
+    digest = hashlib.sha256()
+    with open(temp_path, 'rb') as f:
+        header = f.read(SNIFF_BYTES)
+        digest.update(header)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    extension = require_image_type(header)
+    _commit_original(temp_path, digest.hexdigest(), extension)
+    return digest.hexdigest(), extension
+
+
+def generate_variants(digest, extension):
+    """Write the resized WebP variants of a stored original; returns the names written.
+
+    Needs Pillow; without it the original is served for every variant.
+    Pillow is imported here, in the job, so app startup doesn't pay for it.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.info("Pillow not installed; skipping image variants for %s", digest)
+        return []
+
+    written = []
+    source = os.path.join(UPLOAD_DIR, f'{digest}.{extension}')
+    try:
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            # Shrink step by step from the largest variant down
+            for name, edge in VARIANTS:
+                filename = f'{digest}-{name}.{VARIANT_EXTENSION}'
+                path = os.path.join(UPLOAD_DIR, filename)
+                image.thumbnail((edge, edge))
+                if os.path.exists(path):
+                    continue
+                temp_path = path + '.tmp'
+                image.save(temp_path, 'WEBP', quality=VARIANT_QUALITY, method=4)
+                os.replace(temp_path, path)
+                written.append(name)
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning("Could not generate variants for %s: %s", digest, e)
+    return written
+
+
+def original_url(digest, extension):
+    return f'{UPLOAD_URL_PREFIX}{digest}.{extension}'
+
+
+def _find_variants(image_url):
+    """Check the disk for an image's variants; returns (urls, complete)"""
+    match = CONTENT_ADDRESSED_URL.match(image_url)
+    if not match:
+        return {name: image_url for name, _ in VARIANTS}, True
+    urls = {}
+    for name, _ in VARIANTS:
+        filename = f'{match.group(1)}-{name}.{VARIANT_EXTENSION}'
+        exists = os.path.exists(os.path.join(UPLOAD_DIR, filename))
+        urls[name] = UPLOAD_URL_PREFIX + filename if exists else image_url
+    return urls, image_url not in urls.values()
+
+
+class VariantCache:
+    """image_url -> its variant URLs, so serializing an item doesn't stat files.
+
+    Variant files are never deleted, so a complete set (or a URL that can't
+    have variants) is kept for good. A set still missing sizes, because the
+    image_variants job hasn't run yet or Pillow is absent, is rechecked
+    after ttl seconds; the worker that runs the job refreshes it at once.
+    """
+
+    def __init__(self, ttl=60, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, image_url):
+        entry = self._entries.get(image_url)
+        if entry is None or entry[1] < time.monotonic():
+            urls, complete = _find_variants(image_url)
+            entry = (urls, float('inf') if complete else time.monotonic() + self.ttl)
+            with self._lock:
+                if image_url not in self._entries and len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+                self._entries[image_url] = entry
+        return dict(entry[0])
+
+    def forget(self, image_url):
+        with self._lock:
+            self._entries.pop(image_url, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+variant_cache = VariantCache(ttl=VARIANT_RECHECK_SECONDS, max_entries=VARIANT_CACHE_ENTRIES)
+
+
+def variant_urls(image_url):
+    """Map each variant name to its URL, falling back to the original image.
+
+    Items whose image_url predates content addressing (or points elsewhere)
+    get the original URL for every variant.
+    """
+    if not image_url:
+        return None
+    return variant_cache.get(image_url)
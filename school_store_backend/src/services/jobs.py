@@ -0,0 +1,238 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update
+from src.models.user import db
+from src.models.job import Job
+from src.utils.db_pool import is_serverless
+import atexit
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Handler functions by job kind: handler(payload, context) -> JSON-serialisable result
+JOB_HANDLERS = {}
+
+# Seconds between progress writes, however often a handler reports
+PROGRESS_INTERVAL = 1.0
+
+# Files produced by jobs (e.g. exports), served by /api/jobs/<id>/download
+JOB_FILES_DIR = os.environ.get('JOB_FILES_DIR') or os.path.join(tempfile.gettempdir(), 'school-store-jobs')
+
+
+def job_file_path(job_id, filename):
+    """Where a job writes its output file; the name never comes from the client"""
+    os.makedirs(JOB_FILES_DIR, exist_ok=True)
+    return os.path.join(JOB_FILES_DIR, f'{job_id}-{os.path.basename(filename)}')
+
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+class JobContext:
+    """Passed to handlers so they can report progress (which is also the heartbeat)"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def progress(self, current, total=None, message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        values = {'progress_current': current, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['progress_message'] = message[:255]
+        # Own connection and transaction, so the handler's session is untouched
+        with db.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == self.job_id).values(**values))
+
+
+class JobRunner:
+    """In-process background job runner backed by the jobs table.
+
+    Jobs are rows: submit() inserts one as 'queued' and worker threads in
+    every app process claim the oldest with a guarded UPDATE, so several
+    gunicorn workers can share the queue without a broker. A job whose
+    worker stops heartbeating (the process died) is requeued, up to
+    JOB_MAX_ATTEMPTS. Threads start with the first request. Where no
+    thread can outlive the request (serverless), or with JOB_RUNNER=off,
+    submit() runs the job inline instead; it is still recorded, so the
+    status endpoints behave the same.
+
+        JOB_RUNNER         on/off (default off when serverless)
+        JOB_WORKERS        worker threads per process (default 1)
+        JOB_POLL_INTERVAL  seconds between queue polls when idle (default 2)
+        JOB_STALE_SECONDS  heartbeat age after which a running job is requeued
+        JOB_MAX_ATTEMPTS   runs before a repeatedly abandoned job is failed
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.workers = int(os.environ.get('JOB_WORKERS', '1'))
+        self.poll_interval = float(os.environ.get('JOB_POLL_INTERVAL', '2'))
+        self.stale_after = int(os.environ.get('JOB_STALE_SECONDS', '900'))
+        self.max_attempts = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_recovery = None
+
+    def init_app(self, app):
+        self.app = app
+        default = 'off' if is_serverless() else 'on'
+        self.enabled = os.environ.get('JOB_RUNNER', default).lower() not in ('off', '0', 'false')
+        if self.enabled:
+            app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            prefix = f'{socket.gethostname()}:{os.getpid()}'
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, args=(f'{prefix}:{index}',),
+                                          name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def submit(self, kind, payload=None, created_by=None):
+        """Queue a job and return its id; runs it now if there are no workers"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f'Unknown job kind: {kind}')
+        with db.engine.begin() as conn:
+            job_id = conn.execute(insert(Job).values(
+                kind=kind, status='queued', payload=json.dumps(payload or {}),
+                created_by=created_by, attempts=0, progress_current=0,
+                created_at=datetime.utcnow()).returning(Job.id)).scalar_one()
+
+        if self.enabled:
+            self._wake.set()
+        elif self._claim(f'inline:{os.getpid()}', job_id):
+            self._run(job_id)
+        return job_id
+
+    def _claim(self, worker, job_id=None):
+        """Mark a queued job as running by this worker; returns its id or None.
+
+        The status check in the WHERE clause makes the claim atomic: when two
+        workers race for the same row only one UPDATE matches.
+        """
+        target = job_id if job_id is not None else select(Job.id)\
+            .where(Job.status == 'queued').order_by(Job.id).limit(1).scalar_subquery()
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            return conn.execute(
+                update(Job).where(Job.id == target, Job.status == 'queued')
+                .values(status='running', locked_by=worker, started_at=now,
+                        heartbeat_at=now, attempts=Job.attempts + 1)
+                .returning(Job.id)).scalar_one_or_none()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with db.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == job_id).values(
+                status=status, finished_at=datetime.utcnow(), payload=None,
+                result=json.dumps(result) if result is not None else None,
+                error=error))
+
+    def _run(self, job_id):
+        """Run a claimed job and record its outcome"""
+        with db.engine.connect() as conn:
+            kind, payload = conn.execute(
+                select(Job.kind, Job.payload).where(Job.id == job_id)).one()
+        payload = json.loads(payload or '{}')
+
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            self._finish(job_id, 'failed', error=f'No handler for job kind {kind}')
+            return
+        started = time.perf_counter()
+        try:
+            result = handler(payload, JobContext(job_id))
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Job %s (%s) failed", job_id, kind)
+            self._finish(job_id, 'failed', error=str(e)[:1000] or e.__class__.__name__)
+        else:
+            self._finish(job_id, 'succeeded', result=result)
+            logger.info("Job %s (%s) finished in %.2fs", job_id, kind, time.perf_counter() - started)
+
+    def recover_stale(self):
+        """Requeue running jobs whose worker stopped heartbeating; fail them past max attempts"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = (Job.status == 'running', Job.heartbeat_at < cutoff)
+        with db.engine.connect() as conn:
+            # Read first; only write when something is actually stale
+            if conn.execute(select(Job.id).where(*stale).limit(1)).first() is None:
+                return 0
+        with db.engine.begin() as conn:
+            conn.execute(update(Job).where(*stale, Job.attempts >= self.max_attempts).values(
+                status='failed', finished_at=datetime.utcnow(), payload=None,
+                error='Worker stopped responding'))
+            requeued = conn.execute(update(Job).where(*stale).values(
+                status='queued', locked_by=None)).rowcount
+        if requeued:
+            logger.warning("Requeued %s stale job(s)", requeued)
+        return requeued
+
+    def _has_queued(self):
+        """Cheap read used by idle polls, so an empty queue costs no write transaction"""
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(Job.id).where(Job.status == 'queued').limit(1)).first() is not None
+
+    def _work(self, worker):
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    # Stale jobs are rare: look for them at start-up, then once
+                    # per JOB_STALE_SECONDS / 4 rather than on every poll
+                    if self._last_recovery is None or \
+                            time.monotonic() - self._last_recovery > self.stale_after / 4:
+                        self._last_recovery = time.monotonic()
+                        self.recover_stale()
+                    if self._has_queued():
+                        job_id = self._claim(worker)
+                        if job_id is not None:
+                            self._run(job_id)
+                            continue
+                backoff = self.poll_interval
+            except Exception as e:
+                # Table missing or database down: keep trying, more slowly
+                logger.warning("Job worker %s could not poll the queue: %s", worker, e)
+                backoff = min(backoff * 2, 60)
+            self._wake.wait(backoff)
+            self._wake.clear()
+
+def submit_job(kind, payload=None, created_by=None):
+    """Queue a background job; returns the job id.
+
+    Call it after the request has committed its own changes: when the job
+    runs inline it shares the request's session.
+    """
+    return job_runner.submit(kind, payload, created_by)
+
+
+job_runner = JobRunner()
@@ -0,0 +1,105 @@
+import bisect
+import os
+import threading
+import time
+from src.models.user import User, db
+
+
+class Leaderboard:
+    """Student balances kept sorted in memory.
+
+    Entries are (-points_balance, user_id) tuples in a sorted list, so the
+    top k is a slice and one student's rank is a binary search. Balance
+    changes are applied incrementally by the routes that make them. The board
+    is (re)built from the database on first use, after invalidate(), and every
+    refresh_interval seconds so that workers pick up changes made by other
+    processes.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._entries = []
+        self._students = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def rebuild(self):
+        """Reload every student's balance from the database"""
+        rows = db.session.query(
+            User.id, User.first_name, User.last_name, User.points_balance
+        ).filter(User.role == 'student').all()
+
+        students = {row.id: (row.first_name, row.last_name, row.points_balance or 0)
+                    for row in rows}
+        entries = sorted((-balance, user_id)
+                         for user_id, (_, _, balance) in students.items())
+
+        with self._lock:
+            self._students = students
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a rebuild on the next read, e.g. after students are added or removed"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval:
+            self.rebuild()
+
+    def update_balance(self, user_id, new_balance):
+        """Move one student to their new position after a committed balance change"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            student = self._students.get(user_id)
+            if student is None:
+                # Not a student we know about yet; pick it up on the next rebuild
+                self._loaded_at = None
+                return
+
+            first_name, last_name, old_balance = student
+            index = bisect.bisect_left(self._entries, (-old_balance, user_id))
+            if index < len(self._entries) and self._entries[index] == (-old_balance, user_id):
+                del self._entries[index]
+            bisect.insort(self._entries, (-new_balance, user_id))
+            self._students[user_id] = (first_name, last_name, new_balance)
+
+    def update_balances(self, new_balances):
+        for user_id, new_balance in new_balances.items():
+            self.update_balance(user_id, new_balance)
+
+    def _entry(self, rank, user_id):
+        first_name, last_name, balance = self._students[user_id]
+        return {
+            'rank': rank,
+            'user_id': user_id,
+            'first_name': first_name,
+            'last_name': last_name,
+            'points_balance': balance
+        }
+
+    def top(self, limit):
+        """Return the top limit students, best first"""
+        self._ensure_loaded()
+        with self._lock:
+            return [self._entry(rank, user_id)
+                    for rank, (_, user_id) in enumerate(self._entries[:max(limit, 0)], 1)]
+
+    def rank_of(self, user_id):
+        """Return one student's leaderboard entry, or None if they are not a student"""
+        self._ensure_loaded()
+        with self._lock:
+            student = self._students.get(user_id)
+            if student is None:
+                return None
+            index = bisect.bisect_left(self._entries, (-student[2], user_id))
+            entry = self._entry(index + 1, user_id)
+            entry['total_students'] = len(self._entries)
+            return entry
+
+
+leaderboard = Leaderboard(
+    refresh_interval=int(os.environ.get('LEADERBOARD_REFRESH_INTERVAL', '60')))
@@ -0,0 +1,38 @@
+from sqlalchemy import case, update
+from src.models.user import User, db
+
+
+def debit_balance(user_id, amount):
+    """Subtract amount from a user's balance only if the balance covers it.
+
+    Runs as a single conditional UPDATE inside the caller's transaction, so two
+    concurrent purchases can never both spend the same points. Returns the new
+    balance, or None when the user does not exist or has too few points.
+    """
+    new_balance = db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.points_balance >= amount)
+        .values(points_balance=User.points_balance - amount)
+        .returning(User.points_balance),
+        execution_options={'synchronize_session': False}
+    ).scalar_one_or_none()
+    return new_balance
+
+
+def credit_balances(totals):
+    """Add points to many balances with one set-based UPDATE.
+
+    totals maps user_id to the amount to add. Runs inside the caller's
+    transaction and returns a dict of user_id to new balance.
+    """
+    if not totals:
+        return {}
+
+    rows = db.session.execute(
+        update(User)
+        .where(User.id.in_(totals.keys()))
+        .values(points_balance=User.points_balance + case(totals, value=User.id, else_=0))
+        .returning(User.id, User.points_balance),
+        execution_options={'synchronize_session': False}
+    ).all()
+    return {user_id: balance for user_id, balance in rows}
@@ -0,0 +1,177 @@
+from datetime import datetime
+from sqlalchemy import case, func, insert, select, update
+from src.models.user import User, db
+from src.models.points_transaction import PointsTransaction
+from src.models.reconciliation import LedgerDrift, ReconciliationRun
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Width of the user id window checked per round trip
+RECONCILE_CHUNK_SIZE = int(os.environ.get('RECONCILE_CHUNK_SIZE', '1000'))
+
+# How drift is repaired: 'balance' sets points_balance to the ledger total,
+# 'ledger' posts an adjusting transaction so the ledger matches the balance
+REPAIR_MODES = ('balance', 'ledger')
+
+# What a user's transactions add up to: SUM(earned) - SUM(spent)
+SIGNED_AMOUNT = case((PointsTransaction.transaction_type == 'earned', PointsTransaction.amount),
+                     else_=-PointsTransaction.amount)
+
+
+class ReconciliationConflict(RuntimeError):
+    """Another worker moved the run's checkpoint first"""
+
+
+def start_run(repair=None, created_by=None, chunk_size=None):
+    """Record a new reconciliation run covering every user that exists now"""
+    if repair is not None and repair not in REPAIR_MODES:
+        raise ValueError(f"repair must be one of {', '.join(REPAIR_MODES)}")
+    run = ReconciliationRun(
+        repair=repair, created_by=created_by,
+        chunk_size=chunk_size or RECONCILE_CHUNK_SIZE,
+        max_user_id=db.session.query(func.max(User.id)).scalar() or 0)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+def chunk_balances(first_id, last_id):
+    """(user_id, points_balance, ledger_balance) for users in an id window.
+
+    One statement: the ledger is summed per user with a GROUP BY restricted
+    to the window (served by the user_id index), and joined to the stored
+    balances, so both sides come from the same snapshot.
+    """
+    ledger = select(
+        PointsTransaction.user_id,
+        func.sum(SIGNED_AMOUNT).label('total')
+    ).where(PointsTransaction.user_id.between(first_id, last_id))\
+        .group_by(PointsTransaction.user_id).subquery()
+
+    return db.session.execute(
+        select(User.id, func.coalesce(User.points_balance, 0), func.coalesce(ledger.c.total, 0))
+        .outerjoin(ledger, ledger.c.user_id == User.id)
+        .where(User.id.between(first_id, last_id))
+        .order_by(User.id)
+    ).all()
+
+
+def _repair_balances(user_ids):
+    """Set each balance to its ledger total, recomputed inside the UPDATE"""
+    ledger_total = select(func.coalesce(func.sum(SIGNED_AMOUNT), 0))\
+        .where(PointsTransaction.user_id == User.id).scalar_subquery()
+    return db.session.execute(
+        update(User).where(User.id.in_(user_ids))
+        .values(points_balance=ledger_total)
+        .returning(User.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+
+
+def _repair_ledger(run, drifts):
+    """Post one adjusting transaction per drifted account.
+
+    Uses the difference observed in this chunk: an award or purchase that
+    commits in between changes balance and ledger together, so the
+    difference still holds.
+    """
+    db.session.execute(insert(PointsTransaction), [{
+        'user_id': user_id,
+        'transaction_type': 'earned' if balance > ledger_balance else 'spent',
+        'amount': abs(balance - ledger_balance),
+        'reason': f'Ledger reconciliation (run {run.id})',
+        'created_by': run.created_by,
+        'created_at': datetime.utcnow()
+    } for user_id, balance, ledger_balance in drifts])
+    return [user_id for user_id, _, _ in drifts]
+
+
+def reconcile_chunk(run):
+    """Check the next id window of a run, record and repair its drift, and
+    move the checkpoint, all in one short transaction. Returns False when
+    the run has covered every user.
+    """
+    if run.last_user_id >= run.max_user_id:
+        return False
+
+    first_id = run.last_user_id + 1
+    last_id = min(run.last_user_id + run.chunk_size, run.max_user_id)
+    rows = chunk_balances(first_id, last_id)
+    drifts = [(user_id, balance, ledger_balance) for user_id, balance, ledger_balance in rows
+              if balance != ledger_balance]
+
+    # Claim the window by moving the checkpoint from where we found it. The
+    # checkpoint commits with the repairs, so a resumed run never repairs a
+    # window twice, and two workers on one run can't both take a window
+    claimed = db.session.execute(
+        update(ReconciliationRun)
+        .where(ReconciliationRun.id == run.id, ReconciliationRun.last_user_id == run.last_user_id)
+        .values(last_user_id=last_id, updated_at=datetime.utcnow(),
+                users_checked=ReconciliationRun.users_checked + len(rows),
+                drifted=ReconciliationRun.drifted + len(drifts)),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        raise ReconciliationConflict(f'Reconciliation run {run.id} is being processed elsewhere')
+
+    repaired = set()
+    if drifts and run.repair == 'balance':
+        repaired = set(_repair_balances([user_id for user_id, _, _ in drifts]))
+    elif drifts and run.repair == 'ledger':
+        repaired = set(_repair_ledger(run, drifts))
+
+    if drifts:
+        db.session.execute(insert(LedgerDrift), [{
+            'run_id': run.id, 'user_id': user_id, 'points_balance': balance,
+            'ledger_balance': ledger_balance, 'repaired': user_id in repaired
+        } for user_id, balance, ledger_balance in drifts])
+        db.session.execute(
+            update(ReconciliationRun).where(ReconciliationRun.id == run.id)
+            .values(repaired=ReconciliationRun.repaired + len(repaired)),
+            execution_options={'synchronize_session': False})
+
+    # Committing expires the run, so the next chunk reads the new checkpoint
+    db.session.commit()
+    return True
+
+
+def reconcile(run_id, progress=None):
+    """Run (or resume) a reconciliation from its checkpoint until done.
+
+    Each window is its own transaction, so no lock on the user table is
+    held for longer than one chunk. progress, if given, is called as
+    progress(last_user_id, max_user_id) after each chunk. Returns the run.
+    """
+    run = db.session.get(ReconciliationRun, run_id)
+    if run is None:
+        raise ValueError(f'Reconciliation run {run_id} not found')
+    if run.status == 'completed':
+        return run
+
+    run.status = 'running'
+    run.error = None
+    db.session.commit()
+    try:
+        while reconcile_chunk(run):
+            if progress:
+                progress(run.last_user_id, run.max_user_id)
+    except ReconciliationConflict as e:
+        logger.warning("%s; leaving it there", e)
+        return run
+    except Exception as e:
+        db.session.rollback()
+        run.status = 'failed'
+        run.error = str(e)[:1000]
+        run.updated_at = datetime.utcnow()
+        db.session.commit()
+        raise
+
+    run.status = 'completed'
+    run.finished_at = datetime.utcnow()
+    db.session.commit()
+    logger.info("Reconciliation run %s checked %s users: %s drifted, %s repaired",
+                run.id, run.users_checked, run.drifted, run.repaired)
+    return run
@@ -0,0 +1,163 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert, or_
+from werkzeug.security import generate_password_hash
+from src.models.user import User, db
+from src.models.points_transaction import PointsTransaction
+from src.utils.db_pool import is_serverless
+
+# Rows checked and inserted per round trip
+IMPORT_BATCH_SIZE = 500
+
+# Below this many passwords the pool start-up costs more than it saves
+MIN_PARALLEL_HASHES = 8
+
+REQUIRED_FIELDS = ['username', 'password', 'first_name', 'last_name']
+VALID_ROLES = {'student', 'teacher'}
+
+# Workers start from a clean process rather than a fork of this one, which
+# may hold database connections, the job runner thread and held locks
+HASH_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Start the password hashing pool on first use, one process per core"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context(HASH_START_METHOD))
+            atexit.register(_pool.shutdown, wait=False)
+        return _pool
+
+
+def hash_passwords(passwords):
+    """Hash passwords with werkzeug's slow hash, spread across all cores.
+
+    Serverless functions can't keep worker processes around, so they hash
+    in-process.
+    """
+    if len(passwords) < MIN_PARALLEL_HASHES or is_serverless():
+        return [generate_password_hash(password) for password in passwords]
+    workers = os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(_get_pool().map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def _clean_record(record):
+    """Normalize one roster row; returns (row, None) or (None, error message)"""
+    if not isinstance(record, dict):
+        return None, 'Row must be an object'
+
+    row = {key: (value.strip() if isinstance(value, str) else value)
+           for key, value in record.items()}
+    for field in REQUIRED_FIELDS:
+        if not row.get(field):
+            return None, f'{field} is required'
+
+    role = row.get('role') or 'student'
+    if role not in VALID_ROLES:
+        return None, f'Invalid role: {role}'
+
+    try:
+        points_balance = int(row.get('points_balance') or 0)
+    except (TypeError, ValueError):
+        return None, 'points_balance must be an integer'
+
+    return {
+        'username': row['username'],
+        'password': str(row['password']),
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'role': role,
+        # Empty emails are stored as NULL so they don't collide
+        'email': row.get('email') or None,
+        'points_balance': points_balance
+    }, None
+
+
+def _import_batch(batch, errors, created_by=None):
+    """Check uniqueness with one query, hash in parallel and bulk-insert one batch.
+
+    A nonzero starting balance gets an opening ledger entry in the same
+    transaction, so the balance reconciles with the points ledger.
+    """
+    usernames = {row['username'] for _, row in batch}
+    emails = {row['email'] for _, row in batch if row['email']}
+    taken = db.session.query(User.username, User.email).filter(or_(
+        User.username.in_(usernames), User.email.in_(emails))).all()
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken if email}
+
+    accepted = []
+    for index, row in batch:
+        if row['username'] in taken_usernames:
+            errors.append({'row': index, 'username': row['username'],
+                           'error': 'Username already exists'})
+        elif row['email'] and row['email'] in taken_emails:
+            errors.append({'row': index, 'username': row['username'],
+                           'error': 'Email already exists'})
+        else:
+            accepted.append(row)
+            # Later rows in the same roster can't reuse these either
+            taken_usernames.add(row['username'])
+            if row['email']:
+                taken_emails.add(row['email'])
+
+    if not accepted:
+        return 0
+
+    hashes = hash_passwords([row['password'] for row in accepted])
+    for row, password_hash in zip(accepted, hashes):
+        row['password_hash'] = password_hash
+
+    user_ids = db.session.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True), accepted).scalars().all()
+    opening = [{
+        'user_id': user_id,
+        'transaction_type': 'earned' if row['points_balance'] > 0 else 'spent',
+        'amount': abs(row['points_balance']),
+        'reason': 'Initial points allocation',
+        'created_by': created_by,
+        'created_at': datetime.utcnow()
+    } for user_id, row in zip(user_ids, accepted) if row['points_balance']]
+    if opening:
+        db.session.execute(insert(PointsTransaction), opening)
+    db.session.commit()
+    return len(accepted)
+
+
+def import_roster(records, progress=None, created_by=None):
+    """Create users from a list of roster rows.
+
+    Valid rows are inserted in batches of IMPORT_BATCH_SIZE; invalid or
+    duplicate rows are skipped and reported with their 1-based row number.
+    progress, if given, is called as progress(rows_done, rows_total) after
+    each batch. created_by is the teacher recorded on opening balances.
+    Returns {'created': n, 'errors': [...]}.
+    """
+    errors = []
+    valid = []
+    for index, record in enumerate(records, 1):
+        row, error = _clean_record(record)
+        if error:
+            username = record.get('username') if isinstance(record, dict) else None
+            errors.append({'row': index, 'username': username, 'error': error})
+        else:
+            valid.append((index, row))
+
+    created = 0
+    for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+        created += _import_batch(valid[start:start + IMPORT_BATCH_SIZE], errors, created_by)
+        if progress:
+            progress(min(start + IMPORT_BATCH_SIZE, len(valid)), len(valid))
+
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'errors': errors}
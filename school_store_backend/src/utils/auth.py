@@ -0,0 +1,192 @@
+from flask import current_app, g, jsonify, request, session
+from src.models.user import User, db
+from functools import wraps
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marks "looked up, no such user" so a stale session isn't queried twice
+_MISSING = object()
+
+# Bearer tokens are accepted for this long after login. Logout only clears
+# the session cookie, so a token outlives it until it expires; changing the
+# user's password or role is what invalidates outstanding tokens early
+TOKEN_MAX_AGE = int(os.environ.get('AUTH_TOKEN_MAX_AGE', str(60 * 60)))
+
+
+def user_version(user):
+    """Fingerprint of the fields authorization depends on.
+
+    Changing a user's role or password changes it, which invalidates every
+    claim set issued before the change.
+    """
+    raw = f"{user.role}:{user.password_hash}".encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class UserVersionTable:
+    """In-memory map of user_id to current user_version, or None once revoked.
+
+    update_user and delete_user write through to it, so the worker that made
+    a change rejects old claims on the very next request. Entries expire
+    after ttl seconds and are re-read from the database, which is how other
+    worker processes and restarts pick up changes.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return (known, version); known is False when the entry is missing or expired"""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def set(self, user_id, version):
+        with self._lock:
+            self._entries[user_id] = (version, time.monotonic() + self.ttl)
+
+    def revoke(self, user_id):
+        self.set(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_versions = UserVersionTable(ttl=int(os.environ.get('AUTH_VERSION_TTL', '60')))
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='school-store-auth')
+
+
+def issue_claims(user):
+    """Record a fresh login in the session and return an equivalent bearer token"""
+    version = user_version(user)
+    user_versions.set(user.id, version)
+    session['user_id'] = user.id
+    session['user_role'] = user.role
+    session['user_version'] = version
+    return _serializer().dumps({'uid': user.id, 'role': user.role, 'ver': version})
+
+
+def _read_claims():
+    """Signed claims from the Authorization header or, failing that, the session cookie.
+
+    Returns (claims, from_session), or (None, False) when there are none.
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        try:
+            return _serializer().loads(auth_header[7:], max_age=TOKEN_MAX_AGE), False
+        except BadSignature:
+            return None, False
+    if 'user_id' not in session:
+        return None, False
+    return {
+        'uid': session['user_id'],
+        'role': session.get('user_role'),
+        'ver': session.get('user_version')
+    }, True
+
+
+def _verify_claims(claims, from_session):
+    """Check claims against the version table, hitting the database only on a table miss"""
+    known, version = user_versions.get(claims['uid'])
+    if not known:
+        user = load_current_user(claims['uid'])
+        version = user_version(user) if user else None
+        user_versions.set(claims['uid'], version)
+    if version is None:
+        return False
+
+    if claims.get('ver') is None:
+        # Only session cookies from before versioning lack a version: adopt
+        # the current one if the role still matches. Bearer tokens always
+        # carry one, so an unversioned token is rejected
+        if not from_session:
+            return False
+        user = load_current_user(claims['uid'])
+        if user is None or claims['role'] != user.role:
+            return False
+        claims['ver'] = session['user_version'] = version
+    return claims['ver'] == version
+
+
+def current_claims():
+    """Return the verified {'uid', 'role', 'ver'} claims for this request, or None"""
+    if 'auth_claims' not in g:
+        claims, from_session = _read_claims()
+        g.auth_claims = claims if claims and _verify_claims(claims, from_session) else None
+    return g.auth_claims
+
+
+def current_user_id():
+    claims = current_claims()
+    return claims['uid'] if claims else None
+
+
+def load_current_user(user_id=None):
+    """Return the logged-in User, loading it at most once per request.
+
+    The result is kept on flask.g, so the auth decorators and the handler
+    behind them share a single primary-key lookup. Returns None when nobody
+    is logged in or the user no longer exists.
+    """
+    user = g.get('current_user', None)
+    if user is None:
+        if user_id is None:
+            user_id = current_user_id()
+        if user_id is None:
+            return None
+        user = db.session.get(User, user_id) or _MISSING
+        g.current_user = user
+    return None if user is _MISSING else user
+
+
+# Authentication decorators
+
+
+def _rejected():
+    session.clear()
+    return jsonify({'error': 'Authentication required'}), 401
+
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            if current_claims() is None:
+                return _rejected()
+        except (OperationalError, SQLAlchemyError) as e:
+            logger.error(f"Database error in login_required: {e}")
+            return jsonify({'error': 'Database connection error'}), 503
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def teacher_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            claims = current_claims()
+            if claims is None:
+                return _rejected()
+            # The role comes from the signed, version-checked claims, so no query is needed
+            if claims['role'] != 'teacher':
+                return jsonify({'error': 'Teacher access required'}), 403
+        except (OperationalError, SQLAlchemyError) as e:
+            logger.error(f"Database error in teacher_required: {e}")
+            return jsonify({'error': 'Database connection error'}), 503
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,197 @@
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from src.utils.metrics import Histogram
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the connection wait-time histogram buckets
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Engine options per deployment profile. Sizes are per worker process, so a
+# gunicorn deployment opens up to workers * (pool_size + max_overflow)
+# connections to Postgres.
+PROFILES = {
+    # Long-running gunicorn workers (Render): keep warm connections, recycle
+    # them before the server drops idle ones, and test them after a restart
+    'pooled': {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    },
+    # Serverless (Vercel): one connection per instance, reused while warm;
+    # short recycle because frozen instances lose their sockets
+    'serverless': {
+        'pool_size': 1,
+        'max_overflow': 1,
+        'pool_timeout': 5,
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+    },
+    # Local SQLite file: wait on the write lock instead of failing at once
+    'sqlite': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'connect_args': {'check_same_thread': False, 'timeout': 15},
+    },
+}
+
+# Environment overrides applied on top of the selected profile
+OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+}
+
+
+def normalize_database_url(url):
+    """Fix postgres:// to postgresql:// for SQLAlchemy compatibility"""
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def is_serverless():
+    return bool(os.environ.get('IS_SERVERLESS') or os.environ.get('VERCEL')
+                or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+
+def select_profile(database_uri):
+    """Pick the pooling profile for this process, honouring DB_POOL_PROFILE"""
+    profile = os.environ.get('DB_POOL_PROFILE')
+    if profile:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown DB_POOL_PROFILE '{profile}'. Valid profiles: {list(PROFILES)}")
+        return profile
+    if database_uri.startswith('sqlite'):
+        return 'sqlite'
+    return 'serverless' if is_serverless() else 'pooled'
+
+
+def engine_options(profile, database_uri):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for a profile"""
+    options = dict(PROFILES[profile])
+    for env_name, option in OVERRIDES.items():
+        if os.environ.get(env_name):
+            options[option] = int(os.environ[env_name])
+    if not database_uri.startswith('sqlite'):
+        options.pop('connect_args', None)
+
+    if database_uri == 'sqlite://' or database_uri.startswith('sqlite') and ':memory:' in database_uri:
+        # In-memory databases live in a single connection; let SQLAlchemy pick its pool
+        return {'connect_args': options.get('connect_args', {})}
+    options['poolclass'] = InstrumentedQueuePool
+    return options
+
+
+def configure_database(app, database_url=None):
+    """Set the database URI and engine options on app.config; returns the profile name"""
+    database_uri = normalize_database_url(database_url) or app.config.get('SQLALCHEMY_DATABASE_URI')
+    profile = select_profile(database_uri)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(profile, database_uri)
+    app.config['DB_POOL_PROFILE'] = profile
+    return profile
+
+
+class PoolStats:
+    """Connection wait times and pool timeouts, shared by every instrumented pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait = Histogram(POOL_WAIT_BUCKETS)
+        self.timeouts = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait.observe(seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        """Current pool occupancy plus cumulative wait statistics, as a dict"""
+        stats = {}
+        if isinstance(pool, QueuePool):
+            stats.update(pool_size=pool.size(), checked_out=pool.checkedout(),
+                         checked_in=pool.checkedin(), overflow=max(pool.overflow(), 0))
+        with self._lock:
+            stats.update(waits=self.wait.count, timeouts=self.timeouts,
+                         wait_seconds_total=round(self.wait.total, 6))
+        return stats
+
+    def render(self, pool, profile):
+        """Prometheus text lines for the pool behind the current app's engine"""
+        labels = f'profile="{profile}"'
+        lines = []
+        if isinstance(pool, QueuePool):
+            lines += [
+                '# HELP school_store_db_pool_size Configured persistent connections in the pool.',
+                '# TYPE school_store_db_pool_size gauge',
+                f'school_store_db_pool_size{{{labels}}} {pool.size()}',
+                '# HELP school_store_db_pool_checked_out Connections currently in use.',
+                '# TYPE school_store_db_pool_checked_out gauge',
+                f'school_store_db_pool_checked_out{{{labels}}} {pool.checkedout()}',
+                '# HELP school_store_db_pool_overflow Connections open beyond pool_size.',
+                '# TYPE school_store_db_pool_overflow gauge',
+                f'school_store_db_pool_overflow{{{labels}}} {max(pool.overflow(), 0)}',
+            ]
+        with self._lock:
+            lines += [
+                '# HELP school_store_db_pool_wait_seconds Time spent acquiring a connection from the pool.',
+                '# TYPE school_store_db_pool_wait_seconds histogram',
+            ]
+            lines.extend(self.wait.render('school_store_db_pool_wait_seconds', labels))
+            lines += [
+                '# HELP school_store_db_pool_timeouts_total Requests that gave up waiting for a connection.',
+                '# TYPE school_store_db_pool_timeouts_total counter',
+                f'school_store_db_pool_timeouts_total{{{labels}}} {self.timeouts}',
+            ]
+        return lines
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited.
+
+    The wait includes opening a new connection when the pool has none idle,
+    which is the latency a request actually sees.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+# WAL lets the catalog and history reads proceed while a purchase writes, but
+# it converts the database file for good, so it is opt-in: importing the app
+# must not rewrite the checked-in dev database
+SQLITE_WAL = os.environ.get('SQLITE_WAL', '').lower() in ('1', 'true', 'on')
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def init_engine_events(engine, profile):
+    """Attach per-connection setup for the chosen profile"""
+    if SQLITE_WAL and profile == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        if not event.contains(engine, 'connect', _set_sqlite_pragmas):
+            event.listen(engine, 'connect', _set_sqlite_pragmas)
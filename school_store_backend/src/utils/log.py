@@ -0,0 +1,113 @@
+from flask import g, has_request_context, request
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+# Record attributes copied into the JSON output when present
+CONTEXT_FIELDS = ('endpoint', 'method', 'path', 'user_id')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and request context"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        return json.dumps(payload, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach request details to records and sample low-severity logs per route.
+
+    Runs on the request thread, before the record is queued, because the
+    background writer has no request context. The sampling decision is made
+    once per request, so a sampled request keeps all of its debug/info lines
+    and the others keep none. Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, sample_rates=None, default_rate=1.0):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.default_rate = default_rate
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+
+        record.endpoint = request.endpoint
+        record.method = request.method
+        record.path = request.path
+        claims = g.get('auth_claims')
+        if claims:
+            record.user_id = claims['uid']
+
+        if record.levelno >= logging.WARNING:
+            return True
+        sampled = g.get('log_sampled')
+        if sampled is None:
+            rate = self.sample_rates.get(request.endpoint, self.default_rate)
+            sampled = g.log_sampled = rate >= 1 or random.random() < rate
+        return sampled
+
+
+def parse_sample_rates(value):
+    """Parse "user.login=0.1,store.get_store_items=0.01" into {endpoint: rate}"""
+    rates = {}
+    for part in (value or '').split(','):
+        if '=' not in part:
+            continue
+        endpoint, rate = part.split('=', 1)
+        try:
+            rates[endpoint.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+def configure_logging():
+    """Route all logging through a queue drained by a background writer thread.
+
+    Request threads only format the message and enqueue it; the blocking
+    write to stdout happens on the listener thread. Configured from:
+
+        LOG_LEVEL         root level, default INFO (DEBUG enables debug detail)
+        LOG_SAMPLE_RATE   fraction of requests whose debug/info lines are kept
+        LOG_SAMPLE_RATES  per-endpoint overrides, e.g. "user.login=0.1"
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter(
+        sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES')),
+        default_rate=float(os.environ.get('LOG_SAMPLE_RATE', '1.0'))))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the worker exits
+    atexit.register(_listener.stop)
@@ -0,0 +1,193 @@
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.utils.auth import teacher_required
+import bisect
+import hmac
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the SQL-statements-per-request histogram buckets
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; anyone else must be
+# logged in as a teacher
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the shape Prometheus expects"""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """Per-endpoint latency, status and SQL statistics for a Flask app.
+
+    Requests are labelled by their URL rule (e.g. /api/points/<int:user_id>)
+    rather than the raw path, so label cardinality stays bounded. SQL
+    statements are counted and timed through SQLAlchemy engine events and
+    attributed to the request that issued them. Recording costs a few dict
+    operations per request and per statement. Figures are per process; with
+    several gunicorn workers each one reports its own.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._sql_count = {}
+        self._sql_seconds = {}
+        self._statuses = {}
+        self._collectors = []
+        self._started = time.time()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/api/metrics', 'metrics', self.metrics_view)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines, rendered on each scrape"""
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+
+    def _after_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        key = (endpoint, request.method)
+        status_key = key + (response.status_code,)
+
+        with self._lock:
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._sql_count[key] = Histogram(SQL_COUNT_BUCKETS)
+                self._sql_seconds[key] = 0.0
+            latency.observe(elapsed)
+            self._sql_count[key].observe(g.sql_count)
+            self._sql_seconds[key] += g.sql_seconds
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+        return response
+
+    def render(self):
+        """Return every metric in Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP school_store_request_duration_seconds Request latency by endpoint.',
+                '# TYPE school_store_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), hist in sorted(self._latency.items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                lines.extend(hist.render('school_store_request_duration_seconds', labels))
+
+            lines += [
+                '# HELP school_store_requests_total Requests by endpoint and status code.',
+                '# TYPE school_store_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self._statuses.items()):
+                lines.append(
+                    f'school_store_requests_total{{endpoint="{_escape(endpoint)}",'
+                    f'method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP school_store_request_sql_statements SQL statements issued per request.',
+                '# TYPE school_store_request_sql_statements histogram',
+            ]
+            for (endpoint, method), hist in sorted(self._sql_count.items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                lines.extend(hist.render('school_store_request_sql_statements', labels))
+
+            lines += [
+                '# HELP school_store_request_sql_seconds_total Time spent executing SQL by endpoint.',
+                '# TYPE school_store_request_sql_seconds_total counter',
+            ]
+            for (endpoint, method), seconds in sorted(self._sql_seconds.items()):
+                lines.append(
+                    f'school_store_request_sql_seconds_total{{endpoint="{_escape(endpoint)}",'
+                    f'method="{method}"}} {seconds:.6f}')
+
+        lines += [
+            '# HELP school_store_process_start_time_seconds Start time of this worker process.',
+            '# TYPE school_store_process_start_time_seconds gauge',
+            f'school_store_process_start_time_seconds {self._started:.3f}',
+        ]
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        if METRICS_TOKEN and hmac.compare_digest(
+                request.headers.get('Authorization', '').encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            return self._exposition()
+        return teacher_required(self._exposition)()
+
+    def _exposition(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._sql_count.clear()
+            self._sql_seconds.clear()
+            self._statuses.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+
+
+metrics = RequestMetrics()
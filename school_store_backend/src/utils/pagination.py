@@ -0,0 +1,53 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+
+def wants_cursor(args):
+    """Cursor mode is opt-in: any request carrying cursor or limit uses it"""
+    return 'cursor' in args or 'limit' in args
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Turn a cursor back into (created_at, id); raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def keyset_page(query, model, cursor=None, limit=DEFAULT_LIMIT):
+    """Return one page of query ordered newest first, plus the cursor for the next page.
+
+    Pages are keyed on (created_at, id) so every page is a bounded index range
+    scan; unlike paginate() there is no OFFSET and no COUNT(*).
+    """
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc())\
+        .limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
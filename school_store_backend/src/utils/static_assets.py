@@ -0,0 +1,124 @@
+from flask import send_file
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+# Vite writes fingerprinted bundles as assets/<name>-<hash>.<ext>
+FINGERPRINTED = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# User uploads change at runtime, so they are not part of the build manifest
+EXCLUDED_DIRS = ('uploads',)
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+class StaticAsset:
+    __slots__ = ('path', 'mimetype', 'etag', 'immutable', 'variants')
+
+    def __init__(self, path, mimetype, etag, immutable, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.immutable = immutable
+        self.variants = variants
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+class StaticManifest:
+    """In-memory index of the built frontend in static/.
+
+    Built once, on the first request that needs it, so serving an asset is a
+    dict lookup instead of filesystem probes. Each entry carries a content
+    ETag and any .br/.gz siblings written by compress_static.py. Restart the
+    server (as every deploy does) after replacing the build.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._assets = None
+
+    def build(self):
+        """Scan static/ and replace the manifest; returns {relative path: StaticAsset}"""
+        assets = self._scan()
+        with self._lock:
+            self._assets = assets
+        return assets
+
+    def _scan(self):
+        assets = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [name for name in dirnames if name not in EXCLUDED_DIRS]
+            names = set(filenames)
+            for filename in filenames:
+                if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)) \
+                        and os.path.splitext(filename)[0] in names:
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                variants = {encoding: full_path + suffix
+                            for encoding, suffix in ENCODINGS if filename + suffix in names}
+                assets[rel_path] = StaticAsset(
+                    path=full_path,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    etag=_file_hash(full_path),
+                    immutable=bool(FINGERPRINTED.match(rel_path)),
+                    variants=variants)
+        return assets
+
+    def get(self, path):
+        if self._assets is None:
+            with self._lock:
+                if self._assets is None:
+                    self._assets = self._scan()
+        return self._assets.get(path)
+
+    def send(self, asset, request):
+        """Serve an asset, precompressed if the client accepts it, with cache headers"""
+        path, etag, encoding = asset.path, asset.etag, None
+        for candidate in ENCODINGS:
+            if candidate[0] in asset.variants and request.accept_encodings[candidate[0]]:
+                encoding = candidate[0]
+                path = asset.variants[encoding]
+                etag = f'{asset.etag}-{encoding}'
+                break
+
+        response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True,
+                             download_name=os.path.basename(asset.path), max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if asset.immutable else REVALIDATE_CACHE
+        return response
+
+
+def compress_file(path, brotli=None):
+    """Write .gz (and .br when the brotli module is available) beside a file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    with open(path + '.gz', 'wb') as f:
+        # mtime=0 keeps the output identical across builds
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    written.append(path + '.gz')
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data))
+        written.append(path + '.br')
+    return written
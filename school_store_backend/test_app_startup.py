@@ -6,11 +6,32 @@ This simulates what Render will do when starting the application.
 
 import sys
 import os
+import json
+import subprocess
+import tempfile
 
 # Add the backend directory to Python path
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, backend_dir)
 
+# Create tables in a throwaway SQLite file, not the checked-in database
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.mkdtemp(prefix='school-store-startup-'), 'app.db'))
+
+# Cold-start budget: import plus first request, in a fresh interpreter
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '1500'))
+
+# Run in a subprocess so nothing is already imported or connected
+STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+from render_runner import app
+imported = time.perf_counter()
+app.test_client().get('/api/health')
+print(json.dumps({'import_ms': (imported - started) * 1000,
+                  'first_request_ms': (time.perf_counter() - imported) * 1000}))
+"""
+
 
 def test_import():
     """Test that we can import the app from render_runner"""
@@ -61,6 +82,26 @@ def test_database_config(app):
         return False
 
 
+def test_startup_time(init_mode):
+    """Measure cold start (import + first request) for a DB_INIT_MODE"""
+    db_file = os.path.join(tempfile.mkdtemp(prefix='school-store-startup-'), 'app.db')
+    env = dict(os.environ, DB_INIT_MODE=init_mode, LOG_LEVEL='WARNING',
+               DATABASE_URL=f'sqlite:///{db_file}')
+    result = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=backend_dir,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"✗ Startup probe failed ({init_mode}): {result.stderr.strip()[-300:]}")
+        return False
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    total = timings['import_ms'] + timings['first_request_ms']
+    within = total <= STARTUP_BUDGET_MS
+    print(f"{'✓' if within else '✗'} Cold start ({init_mode}): import {timings['import_ms']:.0f} ms, "
+          f"first request {timings['first_request_ms']:.0f} ms, "
+          f"total {total:.0f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    return within
+
+
 def main():
     print("=" * 50)
     print("Testing Flask App Startup")
@@ -82,6 +123,11 @@ def main():
     # Test database config
     test_database_config(app)
 
+    # Track cold-start time for each initialization mode
+    results = [test_startup_time(mode) for mode in ('eager', 'lazy', 'skip')]
+    if not all(results):
+        sys.exit(1)
+
     print("=" * 50)
     print("All critical tests passed!")
     print("The app should work on Render.")
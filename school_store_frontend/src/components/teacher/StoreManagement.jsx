@@ -131,7 +131,7 @@ const StoreItemForm = ({ item, onSubmit, onCancel }) => {
             <div className="grid gap-2">
                 <Label htmlFor="image">Image</Label>
                 <Input id="image" type="file" onChange={handleImageChange} />
-                {formData.image_url && !imageFile && <img src={formData.image_url} alt={formData.name} className="w-20 h-20 mt-2 object-cover" />}
+                {formData.image_url && !imageFile && <img src={(item?.image_url === formData.image_url && item?.image_variants?.thumb) || formData.image_url} alt={formData.name} className="w-20 h-20 mt-2 object-cover" />}
             </div>
             <div className="flex items-center space-x-2">
                 <Switch